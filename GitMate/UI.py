@@ -1,8 +1,122 @@
 import streamlit as st
 import asyncio
-from agents import Runner
-from main import agent, run_config, session
+import os
+import queue
+import time
+import uuid
+from agents import Runner, ToolCallItem, ToolCallOutputItem
+from openai.types.responses import ResponseTextDeltaEvent
+from main import agent, run_config, store
 from server import github_mcp_server as mcp_server
+from connection import connection
+from fallback import served_tiers
+from tool_selector import TurnContext
+from bulk import SETTLED, BulkRun, load_plan, make_plan, unfinished_plans
+from warmup import warmup
+
+# Seconds between placeholder redraws while text streams in; every redraw is a websocket message.
+UPDATE_INTERVAL = 0.1
+
+
+def stream_turn(prompt, turn, session, status_box, text_box):
+    """Run one chat turn streamed on the MCP loop, drawing text and tool progress as it arrives.
+
+    The run happens on the connection's background loop; its events come back to this (the
+    Streamlit script) thread through a queue.
+    """
+    events = queue.Queue()
+
+    async def produce():
+        try:
+            result = Runner.run_streamed(agent, prompt, context=turn, run_config=run_config, session=session)
+            async for event in result.stream_events():
+                if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                    events.put(("delta", event.data.delta))
+                elif event.type == "run_item_stream_event" and isinstance(event.item, ToolCallItem):
+                    raw = event.item.raw_item
+                    events.put(("tool", (getattr(raw, "call_id", None), getattr(raw, "name", "tool"))))
+                elif event.type == "run_item_stream_event" and isinstance(event.item, ToolCallOutputItem):
+                    raw = event.item.raw_item
+                    call_id = raw.get("call_id") if isinstance(raw, dict) else getattr(raw, "call_id", None)
+                    events.put(("tool_done", call_id))
+            return result
+        finally:
+            events.put(None)
+
+    future = connection.submit(produce)
+    text, tools, last_draw = "", {}, 0.0
+
+    def draw_status():
+        status_box.markdown("  \n".join(f"{'✅' if done else '⏳'} `{name}`" for name, done in tools.values()))
+
+    while True:
+        try:
+            event = events.get(timeout=UPDATE_INTERVAL)
+        except queue.Empty:
+            if future.done():
+                break
+            continue
+        if event is None:
+            break
+        kind, value = event
+        if kind == "delta":
+            text += value
+            if time.monotonic() - last_draw >= UPDATE_INTERVAL:
+                text_box.markdown(text + "▌")
+                last_draw = time.monotonic()
+        elif kind == "tool":
+            tools[value[0]] = [value[1], False]
+            draw_status()
+        elif kind == "tool_done" and value in tools:
+            tools[value][1] = True
+            draw_status()
+
+    return future.result()
+
+
+# Messages shown at once; "Load earlier" adds another window's worth.
+CHAT_WINDOW = int(os.getenv("CHAT_WINDOW", "30"))
+
+
+def _load_earlier():
+    st.session_state.chat_window = st.session_state.get("chat_window", CHAT_WINDOW) + CHAT_WINDOW
+
+
+@st.fragment
+def render_history(messages):
+    """Show the last messages, with a pager for earlier ones.
+
+    Each rerun costs O(window) rather than O(history). A fragment, so paging back only reruns
+    this part of the page.
+    """
+    shown = st.session_state.setdefault("chat_window", CHAT_WINDOW)
+    start = max(0, len(messages) - shown)
+    if start:
+        st.button(f"⬆️ Load earlier messages ({start} more)", key="chat_load_earlier",
+                  on_click=_load_earlier, use_container_width=True)
+    for message in messages[start:]:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+
+def run_bulk(plan_id, progress_bar, status_box):
+    """Execute a saved bulk plan on the MCP loop, updating a progress bar as operations finish."""
+    events = queue.Queue()
+    future = connection.submit(lambda: BulkRun(plan_id, on_event=events.put).run())
+    while not future.done() or not events.empty():
+        try:
+            event = events.get(timeout=UPDATE_INTERVAL)
+        except queue.Empty:
+            continue
+        if event["type"] == "paused":
+            status_box.warning(f"Rate limited; all workers paused for {event['seconds']:.0f}s…")
+            continue
+        p = event["progress"]
+        progress_bar.progress((p.done + p.failed + p.unknown) / max(p.total, 1),
+                              text=f"{p.done} done, {p.failed} failed, {p.unknown} unknown of {p.total} "
+                                   f"({p.retries} retries)")
+    return future.result()
+
 
 st.set_page_config(
     page_title="GitMate",
@@ -23,7 +137,7 @@ st.markdown(
 
 with st.sidebar:
     st.markdown("## 🧭 Navigation")
-    page = st.radio("Go to", [" 💬 Chat", " 🛠️ Tools", " ℹ️ About"], label_visibility="collapsed")
+    page = st.radio("Go to", [" 💬 Chat", " 📦 Bulk", " 🛠️ Tools", " ℹ️ About"], label_visibility="collapsed")
 
     st.markdown("---")
     st.markdown("### GitHub Tools")
@@ -31,29 +145,39 @@ with st.sidebar:
     if st.button("Refresh Tools", use_container_width=True):
         with st.spinner("Fetching tools from GitHub MCP…"):
             try:
-                async def _list():
-                    async with mcp_server:
-                        await mcp_server.connect()
-                        raw = await mcp_server.list_tools()
-                        # Pydantic V2 → model_dump()
-                        return [t.model_dump() if hasattr(t, "model_dump") else t for t in raw]
-                st.session_state.tools = asyncio.run(_list())
+                raw = connection.run(mcp_server.refresh_tools, retry=True)
+                # Pydantic V2 → model_dump()
+                st.session_state.tools = [t.model_dump() if hasattr(t, "model_dump") else t for t in raw]
                 st.success(f"Loaded {len(st.session_state.tools)} tools")
             except asyncio.TimeoutError:
                 st.error("MCP timed out. Check your token / network.")
             except Exception as e:
                 st.error(f"Error: {e}")
 
+    stats = mcp_server.result_cache.summary()
+    if stats["hits"] or stats["misses"]:
+        st.caption(f"Result cache: {stats['hits']} hits / {stats['hits'] + stats['misses']} reads "
+                   f"({stats['hit_rate']:.0%}), {stats['invalidations']} invalidations")
+
+if not warmup.done.is_set():
+    # Only the very first sessions after a start get here; they wait for warm-up instead of doing it.
+    with st.spinner("GitMate is starting up…"):
+        warmup.wait()
+
 if page == " 💬 Chat":
     if "messages" not in st.session_state:
         st.session_state.messages = [
             {"role": "assistant",
              "content": "Hi! I'm **GitMate**. Which repo should we work on? "}
         ]
+    if "recent_tools" not in st.session_state:
+        st.session_state.recent_tools = []
+    if "session_id" not in st.session_state:
+        # Each browser session gets its own agent history.
+        st.session_state.session_id = uuid.uuid4().hex
+    session = store.session(st.session_state.session_id)
 
-    for msg in st.session_state.messages:
-        with st.chat_message(msg["role"]):
-            st.markdown(msg["content"])
+    render_history(st.session_state.messages)
 
     if prompt := st.chat_input("Ask about your GitHub repos…"):
         st.session_state.messages.append({"role": "user", "content": prompt})
@@ -61,38 +185,103 @@ if page == " 💬 Chat":
             st.markdown(prompt)
 
         with st.chat_message("assistant"):
-            with st.spinner("Thinking…"):
-                try:
-                    async def _run():
-                        async with mcp_server:
-                            await mcp_server.connect()
-                            r = await Runner.run(agent, prompt,
-                                                run_config=run_config,
-                                                session=session)
-                            return r.final_output
-                    response = asyncio.run(_run())
-                except asyncio.TimeoutError:
-                    response = "MCP request timed out. Try again in a moment."
-                except Exception as e:
-                    response = f"Error: `{e}`"
-
-            st.markdown(response)
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            # Filled by the fallback model with the tier that served each model call.
+            tiers = []
+            served_tiers.set(tiers)
+            # Carries the message to the tool selector, which sends only the relevant MCP tools.
+            turn = TurnContext(query=prompt, recent_tools=st.session_state.recent_tools)
+            status_box = st.empty()
+            text_box = st.empty()
+            text_box.markdown("*Thinking…*")
+            try:
+                # Streams on the shared, already-connected MCP session.
+                r = stream_turn(prompt, turn, session, status_box, text_box)
+                response = r.final_output
+                used = [item.raw_item.name for item in r.new_items
+                        if isinstance(item, ToolCallItem) and hasattr(item.raw_item, "name")]
+                st.session_state.recent_tools = list(dict.fromkeys(used + st.session_state.recent_tools))[:8]
+            except asyncio.TimeoutError:
+                response = "MCP request timed out. Try again in a moment."
+            except Exception as e:
+                response = f"Error: `{e}`"
 
+            reply = {"role": "assistant", "content": response}
+            text_box.markdown(response)
+            if tiers:
+                st.caption(f"Answered by {tiers[-1]}")
+            if turn.selected is not None:
+                st.caption(f"Sent {len(turn.selected)} of {turn.tools_total} tools "
+                           f"(~{turn.tokens_saved:,} prompt tokens saved per model call)")
+            st.session_state.messages.append(reply)
+
+
+elif page == " 📦 Bulk":
+    st.markdown("## Bulk Operations")
+    st.info("Describe one change to make across many repos or issues. GitMate plans it with read-only "
+            "tools, you review the plan, then it runs in parallel and can be resumed if interrupted.")
+
+    request = st.text_area("What should be done?",
+                           placeholder="Label every open issue without comments in octo-org/api as `stale`")
+    if st.button("Plan", disabled=not request):
+        with st.spinner("Planning…"):
+            try:
+                st.session_state.bulk_plan_id = connection.run(lambda: make_plan(request))
+            except Exception as e:
+                st.error(f"Planning failed: {e}")
+
+    unfinished = unfinished_plans()
+    if unfinished and "bulk_plan_id" not in st.session_state:
+        resume = st.selectbox("Unfinished batches", unfinished)
+        if st.button("Open batch"):
+            st.session_state.bulk_plan_id = resume
+            st.rerun()
+
+    if plan_id := st.session_state.get("bulk_plan_id"):
+        plan, outcomes = load_plan(plan_id)
+        st.markdown(f"**Plan:** {plan['summary']}")
+        st.dataframe(
+            [{"#": i, "tool": op["tool"], "change": op["description"],
+              "status": outcomes.get(i, {}).get("status", "pending")} for i, op in enumerate(plan["operations"])],
+            use_container_width=True, hide_index=True,
+        )
+        if plan["rejected"]:
+            with st.expander(f"{len(plan['rejected'])} operations were rejected"):
+                for op in plan["rejected"]:
+                    st.markdown(f"- {op['description']} — *{op['problem']}*")
+        remaining = sum(outcomes.get(i, {}).get("status") not in SETTLED for i in range(len(plan["operations"])))
+        if remaining and st.button(f"Run {remaining} operations", type="primary"):
+            status_box = st.empty()
+            progress = run_bulk(plan_id, st.progress(0.0), status_box)
+            status_box.empty()
+            if progress.failed or progress.unknown:
+                if progress.failed:
+                    st.error(f"{progress.failed} operations failed; run again to retry them.")
+                if progress.unknown:
+                    st.warning(f"{progress.unknown} operations may or may not have been applied; check them on "
+                               "GitHub. Running again skips them.")
+                for error in progress.errors[:20]:
+                    st.caption(error)
+            else:
+                st.success(f"All {progress.total} operations done.")
+        if st.button("Close batch"):
+            del st.session_state.bulk_plan_id
+            st.rerun()
 
 elif page == " 🛠️ Tools":
     st.markdown("## Available GitHub MCP Tools")
     st.info("These are the **real** actions the agent can call on GitHub.")
 
+    if "tools" not in st.session_state and mcp_server.tool_cache.tools is not None:
+        # Served from the disk cache; stale lists are refreshed in the background.
+        st.session_state.tools = mcp_server.cached_tools()
+        if mcp_server.tool_cache.stale():
+            connection.loop.call_soon_threadsafe(mcp_server.refresh_in_background)
+
     if "tools" not in st.session_state:
         with st.spinner("Loading tools automatically…"):
             try:
-                async def _auto():
-                    async with mcp_server:
-                        await mcp_server.connect()
-                        raw = await mcp_server.list_tools()
-                        return [t.model_dump() if hasattr(t, "model_dump") else t for t in raw]
-                st.session_state.tools = asyncio.run(_auto())
+                raw = connection.run(mcp_server.list_tools, retry=True)
+                st.session_state.tools = [t.model_dump() if hasattr(t, "model_dump") else t for t in raw]
                 st.success(f"Auto-loaded {len(st.session_state.tools)} tools")
             except asyncio.TimeoutError:
                 st.error("MCP timed out while loading tools. Click **Refresh Tools**.")
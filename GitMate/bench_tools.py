@@ -0,0 +1,134 @@
+"""Benchmark a GitMate turn that makes several MCP tool calls at once.
+
+Starts the local GitHub MCP stand-in (fake_github_mcp.py) with a fixed per-call latency and
+runs an agent turn through `Runner.run` (or `Runner.run_streamed` with --stream) with a
+scripted model that asks for N files in a single response. The same turn is timed with the SDK's
+default one-request-at-a-time session and with GitMate's bounded concurrent dispatch.
+
+    python bench_tools.py --calls 5 --latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("MCP_TOKEN", "bench")
+
+from agents import Agent, Model, ModelResponse, Runner, Usage
+from agents.run import RunConfig
+from openai.types.responses import (
+    Response, ResponseCompletedEvent, ResponseFunctionToolCall, ResponseOutputMessage, ResponseOutputText,
+)
+from dispatch import ToolCallLimiter
+from fake_github_mcp import OWNER, build_dataset, build_server
+from server import GitHubMCPServer
+from tool_cache import ToolListCache
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stand_in(port: int, latency: float, dataset):
+    """Serve the fake GitHub MCP server on a daemon thread."""
+    mcp = build_server(dataset, latency=latency, port=port)
+    threading.Thread(target=mcp.run, kwargs={"transport": "streamable-http"}, daemon=True).start()
+
+
+class ScriptedModel(Model):
+    """Asks for all `paths` in one response, then answers."""
+
+    def __init__(self, repo: str, paths: list[str]):
+        self.repo = repo
+        self.paths = paths
+        self.round = 0
+
+    def _next_output(self) -> list:
+        self.round += 1
+        if self.round % 2:
+            return [
+                ResponseFunctionToolCall(
+                    type="function_call", id=f"fc_{i}", call_id=f"call_{self.round}_{i}", name="get_file_contents",
+                    # A new ref per round keeps the result cache out of the measurement.
+                    arguments=json.dumps({"owner": OWNER, "repo": self.repo, "path": path, "ref": str(self.round)}),
+                )
+                for i, path in enumerate(self.paths)
+            ]
+        return [ResponseOutputMessage(
+            type="message", id="msg", role="assistant", status="completed",
+            content=[ResponseOutputText(type="output_text", text="Done.", annotations=[])],
+        )]
+
+    async def get_response(self, *args, **kwargs):
+        return ModelResponse(output=self._next_output(), usage=Usage(), response_id=None)
+
+    async def stream_response(self, *args, **kwargs):
+        # The whole scripted response arrives as one completed event, as from a model that streams no deltas.
+        response = Response(
+            id=f"resp_{self.round + 1}", created_at=time.time(), model="scripted", object="response",
+            output=self._next_output(), parallel_tool_calls=True, tool_choice="auto", tools=[],
+        )
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=0)
+
+
+async def run_turn(agent: Agent, prompt: str, config: RunConfig, stream: bool):
+    if not stream:
+        return await Runner.run(agent, prompt, run_config=config)
+    # The UI streams its turns; draining the events times the same path.
+    result = Runner.run_streamed(agent, prompt, run_config=config)
+    async for _ in result.stream_events():
+        pass
+    return result
+
+
+async def time_turns(server: GitHubMCPServer, model: Model, turns: int, stream: bool = False) -> list[float]:
+    agent = Agent(name="GitMate", instructions="Read the files.", model=model, mcp_servers=[server])
+    config = RunConfig(model=model, tracing_disabled=True)
+    timings = []
+    async with server:
+        await run_turn(agent, "warm up", config, stream)
+        for _ in range(turns):
+            start = time.perf_counter()
+            await run_turn(agent, "Read these files", config, stream)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5, help="tool calls per turn")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per tool call")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--stream", action="store_true", help="run the turns streamed, as the UI does")
+    args = parser.parse_args()
+
+    dataset = build_dataset(repos=1, big_file_kb=1)
+    repo = next(iter(dataset.values()))
+    paths = (sorted(repo.files) * args.calls)[:args.calls]
+    port = free_port()
+    start_stand_in(port, args.latency, dataset)
+    time.sleep(1.5)
+
+    print(f"{args.calls} calls per turn, {args.latency * 1000:.0f} ms each "
+          f"(sum {args.calls * args.latency * 1000:.0f} ms, max {args.latency * 1000:.0f} ms)\n")
+    for label, serialize in (("serialized (SDK default)", True), ("concurrent dispatch", False)):
+        server = GitHubMCPServer(
+            name="bench",
+            params={"url": f"http://127.0.0.1:{port}/mcp"},
+            tool_cache=ToolListCache(os.path.join(tempfile.mkdtemp(), "tools.json"), ttl=3600),
+            limiter=ToolCallLimiter(),
+        )
+        server._serialize_session_requests = serialize
+        timings = asyncio.run(time_turns(server, ScriptedModel(repo.name, paths), args.turns, args.stream))
+        print(f"{label:26} median {sorted(timings)[len(timings) // 2] * 1000:7.0f} ms/turn   "
+              f"peak in flight {server.limiter.peak}")
+
+
+if __name__ == "__main__":
+    main()
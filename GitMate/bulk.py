@@ -0,0 +1,271 @@
+# bulk.py
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable
+from pydantic import BaseModel
+from agents import Agent, Runner
+from code_index import result_text
+from connection import is_connection_error
+from main import model, run_config
+from result_cache import READ_ONLY_TOOLS
+from server import github_mcp_server
+from tool_cache import CACHE_DIR
+from tool_selector import TurnContext
+
+BULK_DIR = os.path.join(CACHE_DIR, "bulk")
+WORKERS = int(os.getenv("GITMATE_BULK_WORKERS", "8"))
+MAX_ATTEMPTS = 4
+# GitHub asks for at least a minute's wait when a rate-limit response has no Retry-After.
+RATE_LIMIT_PAUSE = float(os.getenv("GITMATE_RATE_LIMIT_PAUSE", "60"))
+
+RATE_LIMITED = re.compile(r"rate limit|too many requests|\b429\b|abuse detection", re.I)
+RETRY_AFTER = re.compile(r"retry[- ]after\D{0,5}(\d+)", re.I)
+TRANSIENT = re.compile(r"\b50[234]\b|timed? ?out|temporarily|unavailable", re.I)
+
+# Writes that set state rather than add to it, so sending one twice does no harm. Any other write
+# that times out, gets a 5xx or loses its connection may already have been applied; it is not
+# retried (a retry could open a second issue or post a comment twice) but marked "unknown".
+IDEMPOTENT_TOOLS = {"update_issue", "update_pull_request", "update_pull_request_branch", "create_or_update_file"}
+# Outcomes that running the plan again doesn't touch.
+SETTLED = ("done", "unknown")
+
+
+class Operation(BaseModel):
+    tool: str
+    arguments_json: str
+    description: str
+
+
+class BulkPlan(BaseModel):
+    summary: str
+    operations: list[Operation]
+
+
+def write_tools_reference() -> str:
+    lines = []
+    for tool in github_mcp_server.tool_cache.tools or []:
+        if tool.name in READ_ONLY_TOOLS:
+            continue
+        schema = tool.inputSchema or {}
+        params = ", ".join(f"{name}{'' if name in schema.get('required', []) else '?'}: {spec.get('type', 'any')}"
+                           for name, spec in schema.get("properties", {}).items())
+        lines.append(f"- {tool.name}({params})")
+    return "\n".join(lines)
+
+
+def planner_instructions(run_context, agent) -> str:
+    return f'''
+You plan bulk changes for GitMate. You do NOT make changes yourself.
+
+- Use the read-only tools to find every target (repos, issues, pull requests, files).
+- Then return one operation per change, using exactly one of the write tools below.
+- `arguments_json` is a JSON object with the tool's arguments; `description` is one short line.
+- If nothing matches, return an empty list and say why in `summary`.
+
+Write tools:
+{write_tools_reference()}
+'''.strip()
+
+
+planner = Agent(
+    name="GitMate Planner",
+    instructions=planner_instructions,
+    model=model,
+    mcp_servers=[github_mcp_server],
+    output_type=BulkPlan,
+)
+
+
+def plan_path(plan_id: str) -> str:
+    return os.path.join(BULK_DIR, f"{plan_id}.plan.json")
+
+
+def checkpoint_path(plan_id: str) -> str:
+    return os.path.join(BULK_DIR, f"{plan_id}.jsonl")
+
+
+def validate(operation: Operation) -> str | None:
+    """Why an operation can't run, or None."""
+    tools = {t.name: t for t in github_mcp_server.tool_cache.tools or []}
+    if operation.tool not in tools:
+        return f"unknown tool {operation.tool}"
+    if operation.tool in READ_ONLY_TOOLS:
+        return f"{operation.tool} is read-only"
+    try:
+        arguments = json.loads(operation.arguments_json)
+    except ValueError:
+        return "arguments are not valid JSON"
+    if not isinstance(arguments, dict):
+        return "arguments are not a JSON object"
+    missing = set((tools[operation.tool].inputSchema or {}).get("required", [])) - arguments.keys()
+    if missing:
+        return f"missing {', '.join(sorted(missing))}"
+    return None
+
+
+async def make_plan(request: str) -> str:
+    """Run the planner on a request and save the checked plan. Returns the plan id."""
+    result = await Runner.run(planner, request, context=TurnContext(query=request, read_only=True),
+                              run_config=run_config, max_turns=30)
+    plan: BulkPlan = result.final_output
+    operations, rejected = [], []
+    for op in plan.operations:
+        problem = validate(op)
+        if problem:
+            rejected.append({**op.model_dump(), "problem": problem})
+        else:
+            operations.append(op.model_dump())
+    plan_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+    os.makedirs(BULK_DIR, exist_ok=True)
+    with open(plan_path(plan_id), "w", encoding="utf-8") as f:
+        json.dump({"request": request, "summary": plan.summary, "operations": operations, "rejected": rejected}, f)
+    return plan_id
+
+
+def load_plan(plan_id: str) -> tuple[dict, dict[int, dict]]:
+    """The saved plan and the checkpointed outcome of each finished operation, by index."""
+    with open(plan_path(plan_id), "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    outcomes = {}
+    try:
+        with open(checkpoint_path(plan_id), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash; that operation simply runs again.
+                    continue
+                outcomes[entry["index"]] = entry
+    except OSError:
+        pass
+    return plan, outcomes
+
+
+def unfinished_plans() -> list[str]:
+    """Plans that were started but still have operations that haven't succeeded, newest first."""
+    if not os.path.isdir(BULK_DIR):
+        return []
+    plans = []
+    for name in sorted(os.listdir(BULK_DIR), reverse=True):
+        if not name.endswith(".plan.json"):
+            continue
+        plan_id = name[:-len(".plan.json")]
+        plan, outcomes = load_plan(plan_id)
+        settled = sum(o["status"] in SETTLED for o in outcomes.values())
+        if outcomes and settled < len(plan["operations"]):
+            plans.append(plan_id)
+    return plans
+
+
+@dataclass
+class BulkProgress:
+    total: int
+    done: int = 0
+    failed: int = 0
+    unknown: int = 0
+    retries: int = 0
+    paused_seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+
+class BulkRun:
+    """Executes a saved plan with a pool of workers.
+
+    Every finished operation is appended to a JSONL checkpoint, so a run that is stopped or
+    crashes resumes with only the operations that haven't succeeded. Rate-limited calls (which
+    GitHub rejected) are retried, pausing all workers until the limit has passed; other transient
+    failures are retried with backoff only for idempotent tools.
+    """
+
+    def __init__(self, plan_id: str, workers: int = WORKERS, on_event: Callable[[dict], None] | None = None):
+        self.plan_id = plan_id
+        self.workers = workers
+        self.on_event = on_event or (lambda event: None)
+        plan, outcomes = load_plan(plan_id)
+        self.operations = plan["operations"]
+        statuses = [outcomes.get(i, {}).get("status") for i in range(len(self.operations))]
+        self.pending = [i for i, status in enumerate(statuses) if status not in SETTLED]
+        self.progress = BulkProgress(total=len(self.operations), done=statuses.count("done"),
+                                     unknown=statuses.count("unknown"))
+        self._resume_at = 0.0
+
+    async def run(self) -> BulkProgress:
+        queue = asyncio.Queue()
+        for i in self.pending:
+            queue.put_nowait(i)
+        self._checkpoint = open(checkpoint_path(self.plan_id), "a", encoding="utf-8")
+        try:
+            await asyncio.gather(*(self._worker(queue) for _ in range(min(self.workers, len(self.pending)))))
+        finally:
+            self._checkpoint.close()
+        return self.progress
+
+    async def _worker(self, queue: asyncio.Queue):
+        while not queue.empty():
+            await self._execute(queue.get_nowait())
+
+    async def _wait_if_paused(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _pause(self, seconds: float):
+        """Hold every worker until `seconds` from now (or later, if already paused longer)."""
+        now = time.monotonic()
+        resume_at = now + seconds
+        if resume_at > self._resume_at:
+            self.progress.paused_seconds += resume_at - max(self._resume_at, now)
+            self._resume_at = resume_at
+            self.on_event({"type": "paused", "seconds": seconds})
+
+    async def _execute(self, index: int):
+        op = self.operations[index]
+        arguments = json.loads(op["arguments_json"])
+        error, status = None, "failed"
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await self._wait_if_paused()
+            try:
+                result = await github_mcp_server.fetch_tool(op["tool"], arguments)
+                error = result_text(result) if result.isError else None
+                transient = bool(error and (RATE_LIMITED.search(error) or TRANSIENT.search(error)))
+            except Exception as e:
+                error, transient = f"{type(e).__name__}: {e}", is_connection_error(e)
+            if error is None:
+                self._record(index, "done")
+                return
+            if not transient or attempt == MAX_ATTEMPTS:
+                break
+            rate_limited = RATE_LIMITED.search(error)
+            if not rate_limited and op["tool"] not in IDEMPOTENT_TOOLS:
+                status = "unknown"
+                error += " (not retried: it may have been applied; check on GitHub before running it again)"
+                break
+            backoff = 2.0 ** attempt
+            if rate_limited:
+                wait = RETRY_AFTER.search(error)
+                backoff = max(backoff, float(wait.group(1)) if wait else RATE_LIMIT_PAUSE)
+                self._pause(backoff)
+            self.progress.retries += 1
+            await asyncio.sleep(backoff)
+        self._record(index, status, error)
+
+    def _record(self, index: int, status: str, error: str | None = None):
+        entry = {"index": index, "status": status, "at": time.time()}
+        if error:
+            entry["error"] = error[:500]
+        self._checkpoint.write(json.dumps(entry) + "\n")
+        self._checkpoint.flush()
+        if status == "done":
+            self.progress.done += 1
+        else:
+            if status == "unknown":
+                self.progress.unknown += 1
+            else:
+                self.progress.failed += 1
+            self.progress.errors.append(f"#{index} {self.operations[index]['description']}: {entry.get('error')}")
+        self.on_event({"type": status, "index": index, "progress": self.progress})
@@ -0,0 +1,293 @@
+# code_index.py
+import asyncio
+import json
+import mmap
+import os
+import subprocess
+import tempfile
+import threading
+from array import array
+from agents import function_tool
+from mcp.types import CallToolResult, EmbeddedResource, TextContent, TextResourceContents
+from server import github_mcp_server
+from tool_cache import CACHE_DIR
+
+INDEX_DIR = os.path.join(CACHE_DIR, "index")
+# Local git checkouts laid out as <dir>/<owner>/<repo>; used instead of MCP reads when present.
+MIRROR_DIR = os.getenv("GITMATE_MIRROR_DIR")
+MAX_FILE_BYTES = int(os.getenv("GITMATE_INDEX_MAX_FILE_BYTES", 512 * 1024))
+MAX_MATCHES = 30
+
+
+def trigrams(text: str) -> set[str]:
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def result_text(result: CallToolResult) -> str:
+    """The text of a tool result; file contents may come back as an embedded resource."""
+    for c in result.content:
+        if isinstance(c, EmbeddedResource) and isinstance(c.resource, TextResourceContents):
+            return c.resource.text
+    return "\n".join(c.text for c in result.content if isinstance(c, TextContent))
+
+
+class RepoIndex:
+    """Trigram index of one repository's text files, persisted as three files in `path`.
+
+    `docs.bin` holds the file contents back to back and `postings.bin` the document ids (uint32)
+    of every trigram; both are memory-mapped, so a lookup only touches the pages it needs.
+    `meta.json` has the commit SHA, per-file blob SHAs and offsets, and the trigram lexicon.
+    Searches run in threads; `mapped` keeps the files from being swapped out under one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.sha: str | None = None
+        self.files: list[dict] = []
+        self.lexicon: dict[str, list[int]] = {}
+        self._docs: mmap.mmap | None = None
+        self._postings_map: mmap.mmap | None = None
+        self._postings: memoryview | None = None
+        self.lock = asyncio.Lock()
+        self.mapped = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(os.path.join(self.path, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            docs = self._map("docs.bin")
+            postings = self._map("postings.bin")
+        except (OSError, ValueError):
+            return
+        self.close()
+        self.sha, self.files, self.lexicon = meta["sha"], meta["files"], meta["lexicon"]
+        self._docs = docs
+        self._postings_map = postings
+        self._postings = memoryview(postings).cast("I") if postings is not None else None
+
+    def close(self):
+        """Unmap the index files (Windows can't replace a file that is still mapped)."""
+        if self._postings is not None:
+            self._postings.release()
+            self._postings = None
+        for m in (self._docs, self._postings_map):
+            if m is not None:
+                m.close()
+        self._docs = self._postings_map = None
+
+    def _map(self, name: str) -> mmap.mmap | None:
+        with open(os.path.join(self.path, name), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def blob_shas(self) -> dict[str, str]:
+        return {f["path"]: f["sha"] for f in self.files}
+
+    def text(self, doc: int) -> str:
+        f = self.files[doc]
+        return self._docs[f["offset"]:f["offset"] + f["length"]].decode("utf-8", "replace") if self._docs else ""
+
+    async def save(self, sha: str, texts: dict[str, tuple[str, str]]):
+        """Rebuild the index from `{path: (blob_sha, text)}` at commit `sha`.
+
+        The postings are rebuilt in full (only the reads in `update` are incremental). That is
+        CPU-bound, so it runs in a thread and writes temporary files, which are swapped in once no
+        search is running.
+        """
+        staged = await asyncio.to_thread(self._build, sha, texts)
+        await asyncio.to_thread(self._swap, staged)
+
+    def _swap(self, staged: dict[str, str]):
+        with self.mapped:
+            self.close()
+            for name, tmp in staged.items():
+                os.replace(tmp, os.path.join(self.path, name))
+            self.load()
+
+    def _build(self, sha: str, texts: dict[str, tuple[str, str]]) -> dict[str, str]:
+        files, docs, grams = [], bytearray(), {}
+        for doc, path in enumerate(sorted(texts)):
+            blob_sha, text = texts[path]
+            data = text.encode("utf-8")
+            files.append({"path": path, "sha": blob_sha, "offset": len(docs), "length": len(data)})
+            docs += data
+            for gram in trigrams(text):
+                grams.setdefault(gram, []).append(doc)
+        postings, lexicon = array("I"), {}
+        for gram, ids in grams.items():
+            lexicon[gram] = [len(postings), len(ids)]
+            postings.extend(ids)
+
+        os.makedirs(self.path, exist_ok=True)
+        return {
+            "docs.bin": self._stage(bytes(docs)),
+            "postings.bin": self._stage(postings.tobytes()),
+            "meta.json": self._stage(json.dumps({"sha": sha, "files": files, "lexicon": lexicon}).encode()),
+        }
+
+    def _stage(self, data: bytes) -> str:
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return tmp
+
+    def candidates(self, query: str) -> list[int]:
+        grams = trigrams(query)
+        if not grams:
+            return list(range(len(self.files)))
+        lists = []
+        for gram in grams:
+            if gram not in self.lexicon or self._postings is None:
+                return []
+            offset, count = self.lexicon[gram]
+            lists.append(self._postings[offset:offset + count])
+        lists.sort(key=len)
+        docs = set(lists[0])
+        for ids in lists[1:]:
+            docs.intersection_update(ids)
+        return sorted(docs)
+
+    def search(self, query: str, limit: int = MAX_MATCHES) -> tuple[list[tuple[str, int, str]], int]:
+        """Matching lines as (path, line number, line), and the total number of matches.
+
+        CPU-bound on a large repository; call it in a thread.
+        """
+        needle = query.lower()
+        matches, total = [], 0
+        with self.mapped:
+            for doc in self.candidates(query):
+                for lineno, line in enumerate(self.text(doc).splitlines(), 1):
+                    if needle in line.lower():
+                        total += 1
+                        if len(matches) < limit:
+                            matches.append((self.files[doc]["path"], lineno, line.strip()[:200]))
+        return matches, total
+
+
+class McpSource:
+    """Reads a repository through the GitHub MCP server."""
+
+    def __init__(self, server, owner: str, repo: str):
+        self.server = server
+        self.owner = owner
+        self.repo = repo
+
+    async def _call(self, tool: str, **arguments) -> str:
+        result = await self.server.fetch_tool(tool, {"owner": self.owner, "repo": self.repo, **arguments})
+        if result.isError:
+            raise RuntimeError(result_text(result))
+        return result_text(result)
+
+    async def head(self) -> str:
+        return json.loads(await self._call("list_commits", perPage=1))[0]["sha"]
+
+    async def listing(self, ref: str) -> dict[str, str]:
+        """`{path: blob_sha}` of every indexable file, walking directories level by level."""
+        files, dirs = {}, [""]
+        while dirs:
+            listings = await asyncio.gather(*(self._call("get_file_contents", path=d, ref=ref) for d in dirs))
+            dirs = []
+            for entries in map(json.loads, listings):
+                for entry in entries:
+                    if entry["type"] == "dir":
+                        dirs.append(entry["path"])
+                    elif entry["type"] == "file" and entry.get("size", 0) <= MAX_FILE_BYTES:
+                        files[entry["path"]] = entry["sha"]
+        return files
+
+    async def read(self, path: str, ref: str) -> str:
+        return await self._call("get_file_contents", path=path, ref=ref)
+
+
+class LocalSource:
+    """Reads a repository from a local git checkout."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _git(self, *args: str) -> str:
+        return subprocess.run(["git", "-C", self.path, *args], capture_output=True, check=True,
+                              encoding="utf-8", errors="replace").stdout
+
+    async def head(self) -> str:
+        return (await asyncio.to_thread(self._git, "rev-parse", "HEAD")).strip()
+
+    async def listing(self, ref: str) -> dict[str, str]:
+        out = await asyncio.to_thread(self._git, "ls-tree", "-r", "-l", ref)
+        files = {}
+        for line in out.splitlines():
+            info, path = line.split("\t", 1)
+            _, kind, sha, size = info.split()
+            if kind == "blob" and size != "-" and int(size) <= MAX_FILE_BYTES:
+                files[path] = sha
+        return files
+
+    async def read(self, path: str, ref: str) -> str:
+        return await asyncio.to_thread(self._git, "show", f"{ref}:{path}")
+
+
+async def update(index: RepoIndex, source) -> bool:
+    """Bring the index up to the source's head commit, re-reading only files whose blob SHA changed."""
+    head = await source.head()
+    if head == index.sha:
+        return False
+    listing = await source.listing(head)
+    known = index.blob_shas()
+    kept = {i: f["path"] for i, f in enumerate(index.files) if known.get(f["path"]) == listing.get(f["path"])}
+    texts = {path: (listing[path], index.text(i)) for i, path in kept.items()}
+    changed = [path for path in listing if path not in texts]
+    contents = await asyncio.gather(*(source.read(path, head) for path in changed))
+    for path, text in zip(changed, contents):
+        # Binary files are left out.
+        if "\0" not in text:
+            texts[path] = (listing[path], text)
+    await index.save(head, texts)
+    return True
+
+
+indexes: dict[str, RepoIndex] = {}
+
+
+def repo_index(owner: str, repo: str) -> RepoIndex:
+    key = f"{owner}/{repo}".lower()
+    if key not in indexes:
+        indexes[key] = RepoIndex(os.path.join(INDEX_DIR, key.replace("/", "__")))
+    return indexes[key]
+
+
+def source_for(owner: str, repo: str):
+    mirror = os.path.join(MIRROR_DIR, owner, repo) if MIRROR_DIR else None
+    if mirror and os.path.isdir(os.path.join(mirror, ".git")):
+        return LocalSource(mirror)
+    return McpSource(github_mcp_server, owner, repo)
+
+
+@function_tool
+async def search_repo_code(owner: str, repo: str, query: str) -> str:
+    """Find where text or a symbol appears in one repository, from a local index.
+
+    Much faster than reading files one by one. The first search in a repository builds the
+    index; later searches only re-read files changed since the indexed commit.
+
+    Args:
+        owner: Repository owner.
+        repo: Repository name.
+        query: Text to find, e.g. a function or class name. Case-insensitive.
+    """
+    index = repo_index(owner, repo)
+    try:
+        async with index.lock:
+            await update(index, source_for(owner, repo))
+    except Exception as e:
+        if index.sha is None:
+            return f"Could not index {owner}/{repo}: {e}"
+    # Intersecting postings and scanning candidates would stall every other MCP call on the loop.
+    matches, total = await asyncio.to_thread(index.search, query)
+    if not matches:
+        return f"No matches for {query!r} in {owner}/{repo} ({len(index.files)} files at {index.sha[:7]})."
+    lines = [f"{path}:{lineno}: {line}" for path, lineno, line in matches]
+    lines.append(f"({total} matches; showing {len(matches)}. Index of {len(index.files)} files at {index.sha[:7]}.)")
+    return "\n".join(lines)
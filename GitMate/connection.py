@@ -0,0 +1,136 @@
+# connection.py
+import asyncio
+import threading
+from typing import Awaitable, Callable, TypeVar
+import anyio
+import httpx
+from agents.mcp import MCPServer
+from server import github_mcp_server
+
+T = TypeVar("T")
+
+CONNECTION_ERRORS = (ConnectionError, httpx.TransportError, anyio.ClosedResourceError,
+                     anyio.BrokenResourceError, anyio.EndOfStream)
+
+
+def is_connection_error(error: BaseException | None) -> bool:
+    """Whether an error (or anything it wraps) means the MCP session itself is broken."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, CONNECTION_ERRORS):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class MCPConnection:
+    """Keeps one MCP session open on a background event loop, shared by every rerun and user.
+
+    Streamlit reruns the script on every interaction and `asyncio.run` gives each rerun a fresh
+    loop, so the session used to be opened and closed per message. Here the session lives on a
+    loop in a daemon thread; the UI submits coroutines to it with `run()`.
+
+    The session is opened and closed by a single owner task (MCP transports must be exited in the
+    task that entered them). A health loop pings the server and asks the owner to reconnect when
+    the ping fails.
+    """
+
+    def __init__(self, server: MCPServer, health_interval: float = 30.0, ping_timeout: float = 10.0,
+                 connect_timeout: float = 60.0):
+        self.server = server
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self.connect_timeout = connect_timeout
+        self.last_error: Exception | None = None
+        self.reconnects = 0
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="mcp-loop", daemon=True)
+        self.thread.start()
+        self._ready = asyncio.Event()
+        self._reconnect = asyncio.Event()
+        asyncio.run_coroutine_threadsafe(self._own_session(), self.loop)
+        asyncio.run_coroutine_threadsafe(self._health_loop(), self.loop)
+
+    @property
+    def connected(self) -> bool:
+        return self._ready.is_set()
+
+    def run(self, factory: Callable[[], Awaitable[T]], timeout: float | None = None, retry: bool = False) -> T:
+        """Run `factory()` on the background loop once the session is up and return its result.
+
+        Takes a factory rather than a coroutine so nothing is created on the caller's thread and
+        the call can be repeated. If the session turns out to be broken it is reconnected; with
+        `retry=True` (for read-only calls) the call is then made once more on the new session.
+        """
+        return self.submit(factory, retry).result(timeout)
+
+    def submit(self, factory: Callable[[], Awaitable[T]], retry: bool = False):
+        """Like `run()`, but returns the concurrent.futures.Future instead of waiting."""
+        return asyncio.run_coroutine_threadsafe(self._call(factory, retry), self.loop)
+
+    async def wait_ready(self):
+        try:
+            await asyncio.wait_for(self._ready.wait(), self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"Could not connect to {self.server.name}: {self.last_error}") from None
+
+    async def _call(self, factory: Callable[[], Awaitable[T]], retry: bool) -> T:
+        await self.wait_ready()
+        try:
+            return await factory()
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            self.last_error = e
+            self._reconnect.set()
+            if not retry:
+                raise
+        # Give the owner task a moment to drop the broken session before waiting on the new one.
+        while self._ready.is_set():
+            await asyncio.sleep(0.05)
+        await self.wait_ready()
+        return await factory()
+
+    def reconnect(self):
+        """Ask the owner task to drop the session and open a new one."""
+        self.loop.call_soon_threadsafe(self._reconnect.set)
+
+    async def _own_session(self):
+        backoff = 1.0
+        while True:
+            try:
+                await self.server.connect()
+                backoff = 1.0
+                self.last_error = None
+                self._ready.set()
+                await self._reconnect.wait()
+            except Exception as e:
+                self.last_error = e
+            finally:
+                self._ready.clear()
+                self._reconnect.clear()
+                try:
+                    await self.server.cleanup()
+                except Exception:
+                    pass
+            self.reconnects += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            session = getattr(self.server, "session", None)
+            if not self._ready.is_set() or session is None:
+                continue
+            try:
+                await asyncio.wait_for(session.send_ping(), self.ping_timeout)
+            except Exception as e:
+                self.last_error = e
+                self._reconnect.set()
+
+
+# One connection per process, reused by every Streamlit session and rerun.
+connection = MCPConnection(github_mcp_server)
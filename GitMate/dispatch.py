@@ -0,0 +1,78 @@
+# dispatch.py
+import asyncio
+import os
+from typing import Awaitable, Callable, TypeVar
+from result_cache import READ_ONLY_TOOLS, repo_key
+
+T = TypeVar("T")
+
+MAX_CONCURRENT = int(os.getenv("GITMATE_TOOL_CONCURRENCY", "6"))
+
+# GitHub's search API has a much lower rate limit than the rest of the REST API.
+PER_TOOL_LIMITS = {
+    "search_code": 2,
+    "search_issues": 2,
+    "search_repositories": 2,
+    "search_users": 2,
+}
+
+# Writes (anything not on the read-only list) to the same repository share one slot, so two
+# edits to the same branch never race each other; writes to different repositories don't wait.
+WRITE_LIMIT = 1
+
+
+class ToolCallLimiter:
+    """Bounds how many MCP tool calls are in flight on the shared session.
+
+    The agent runner already starts every tool call of a turn at once and puts the results back
+    in call order; this only caps the fan-out: a global limit plus a tighter one per tool.
+    Semaphores are created lazily so they bind to the MCP loop that first uses them, and a
+    per-tool or per-repository one is dropped once no call holds or waits on it.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT, per_tool: dict[str, int] = PER_TOOL_LIMITS,
+                 write_limit: int = WRITE_LIMIT):
+        self.max_concurrent = max_concurrent
+        self.per_tool = per_tool
+        self.write_limit = write_limit
+        self._global: asyncio.Semaphore | None = None
+        self._slots: dict[str, asyncio.Semaphore] = {}
+        self._users: dict[str, int] = {}
+        self.in_flight = 0
+        self.peak = 0
+
+    def _slot_key(self, tool_name: str, arguments: dict | None) -> tuple[str, int] | None:
+        if tool_name in self.per_tool:
+            return tool_name, self.per_tool[tool_name]
+        if tool_name not in READ_ONLY_TOOLS:
+            return f"<write>{repo_key(arguments)}", self.write_limit
+        return None
+
+    async def run(self, tool_name: str, call: Callable[[], Awaitable[T]], arguments: dict | None = None) -> T:
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrent)
+        slot = key = None
+        if keyed := self._slot_key(tool_name, arguments):
+            key, limit = keyed
+            slot = self._slots.setdefault(key, asyncio.Semaphore(limit))
+            self._users[key] = self._users.get(key, 0) + 1
+        try:
+            if slot is not None:
+                await slot.acquire()
+            try:
+                async with self._global:
+                    self.in_flight += 1
+                    self.peak = max(self.peak, self.in_flight)
+                    try:
+                        return await call()
+                    finally:
+                        self.in_flight -= 1
+            finally:
+                if slot is not None:
+                    slot.release()
+        finally:
+            if key is not None:
+                self._users[key] -= 1
+                if not self._users[key]:
+                    # Idle: nothing holds or waits on it, so one repository per write doesn't stay forever.
+                    del self._users[key], self._slots[key]
@@ -0,0 +1,285 @@
+"""Local stand-in for the GitHub MCP server, for running GitMate offline.
+
+Serves a synthetic, seeded dataset of repositories, files, issues, pull requests and commits
+over Streamable HTTP, with the tool names and parameters of the GitHub MCP server. Latency and
+failures can be injected to exercise GitMate's session handling, caching and concurrency.
+
+    python fake_github_mcp.py --port 8790 --latency 0.2 --error-rate 0.05
+    MCP_URL=http://127.0.0.1:8790/mcp streamlit run UI.py
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp.exceptions import ToolError
+
+OWNER = "octo-org"
+LOGIN = "octocat"
+WORDS = ("cache", "retry", "parser", "token", "session", "client", "worker", "queue", "config", "schema",
+         "index", "stream", "upload", "render", "auth", "router", "limit", "batch", "search", "export")
+LABELS = ("bug", "enhancement", "documentation", "good first issue", "performance", "question")
+
+
+@dataclass
+class Repo:
+    name: str
+    description: str
+    files: dict[str, str] = field(default_factory=dict)
+    issues: list[dict] = field(default_factory=list)
+    pulls: list[dict] = field(default_factory=list)
+    commits: list[dict] = field(default_factory=list)
+    branches: list[str] = field(default_factory=lambda: ["main"])
+
+
+def _timestamp(rng: random.Random) -> str:
+    moment = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=rng.randrange(500_000))
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _python_module(rng: random.Random, lines: int) -> str:
+    out = ['"""Generated module."""', "import os", ""]
+    while len(out) < lines:
+        name = "_".join(rng.sample(WORDS, 2))
+        out += [f"def {name}(value, limit={rng.randrange(1, 100)}):",
+                f'    """Handle {name.replace("_", " ")}."""',
+                f"    return [v for v in value if len(str(v)) < limit]", ""]
+    return "\n".join(out) + "\n"
+
+
+def build_dataset(seed: int = 7, repos: int = 12, issues: int = 60, pulls: int = 20,
+                  big_file_kb: int = 512) -> dict[str, Repo]:
+    """Deterministic synthetic data; the same seed always gives the same repositories."""
+    rng = random.Random(seed)
+    dataset = {}
+    for i in range(repos):
+        name = f"{rng.choice(WORDS)}-{rng.choice(WORDS)}-{i}"
+        repo = Repo(name=name, description=f"A {rng.choice(WORDS)} {rng.choice(WORDS)} service.")
+        repo.files["README.md"] = f"# {name}\n\n{repo.description}\n\n## Usage\n\n    pip install {name}\n"
+        for j in range(rng.randrange(4, 12)):
+            repo.files[f"src/{rng.choice(WORDS)}_{j}.py"] = _python_module(rng, rng.randrange(20, 400))
+        # One oversized file per repository, for exercising output limits.
+        rows = [{"id": n, "key": rng.choice(WORDS), "value": rng.random()} for n in range(big_file_kb * 20)]
+        repo.files["data/fixtures.json"] = json.dumps(rows)
+        for n in range(1, issues + 1):
+            repo.issues.append({
+                "number": n, "title": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} fails on {rng.choice(WORDS)}",
+                "state": rng.choice(("open", "open", "closed")),
+                "user": {"login": rng.choice((LOGIN, "hubot", "monalisa"))},
+                "labels": [{"name": label} for label in rng.sample(LABELS, rng.randrange(0, 3))],
+                "comments": rng.randrange(0, 15), "created_at": _timestamp(rng),
+                "body": " ".join(rng.choices(WORDS, k=rng.randrange(20, 120))),
+            })
+        for n in range(issues + 1, issues + pulls + 1):
+            branch = f"feature/{rng.choice(WORDS)}-{n}"
+            repo.branches.append(branch)
+            repo.pulls.append({
+                "number": n, "title": f"Improve {rng.choice(WORDS)} {rng.choice(WORDS)}",
+                "state": rng.choice(("open", "closed")), "merged": rng.random() < 0.5,
+                "user": {"login": rng.choice((LOGIN, "hubot", "monalisa"))},
+                "head": {"ref": branch}, "base": {"ref": "main"}, "created_at": _timestamp(rng),
+                "body": " ".join(rng.choices(WORDS, k=rng.randrange(10, 60))),
+                "changed_files": rng.randrange(1, 20), "additions": rng.randrange(1, 800),
+                "deletions": rng.randrange(0, 400),
+            })
+        for n in range(50):
+            verb = rng.choice(("Fix", "Add", "Refactor", "Update"))
+            repo.commits.append({
+                "sha": f"{rng.getrandbits(160):040x}", "commit": {
+                    "message": f"{verb} {rng.choice(WORDS)} {rng.choice(WORDS)}",
+                    "author": {"name": rng.choice((LOGIN, "hubot", "monalisa")), "date": _timestamp(rng)}},
+            })
+        dataset[name] = repo
+    return dataset
+
+
+def _page(items: list, page: int, per_page: int) -> list:
+    per_page = max(1, min(per_page, 100))
+    start = (max(page, 1) - 1) * per_page
+    return items[start:start + per_page]
+
+
+def build_server(dataset: dict[str, Repo], latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 8790, seed: int = 7) -> FastMCP:
+    """A FastMCP server exposing GitHub-MCP-shaped tools over the dataset."""
+    rng = random.Random(seed)
+    mcp = FastMCP("github-fake", host=host, port=port, log_level="WARNING")
+
+    async def simulate():
+        if latency or jitter:
+            await asyncio.sleep(max(0.0, rng.gauss(latency, jitter)))
+        if error_rate and rng.random() < error_rate:
+            raise ToolError("API rate limit exceeded (injected)")
+
+    def repo_of(owner: str, repo: str) -> Repo:
+        if owner != OWNER or repo not in dataset:
+            raise ToolError(f"Not Found: {owner}/{repo}")
+        return dataset[repo]
+
+    def dump(data) -> str:
+        return json.dumps(data, indent=1)
+
+    @mcp.tool()
+    async def get_me() -> str:
+        """Get details of the authenticated GitHub user."""
+        await simulate()
+        return dump({"login": LOGIN, "name": "The Octocat", "public_repos": len(dataset)})
+
+    @mcp.tool()
+    async def search_repositories(query: str, page: int = 1, perPage: int = 30) -> str:
+        """Search for GitHub repositories by name or description."""
+        await simulate()
+        terms = query.lower().split()
+        hits = [{"full_name": f"{OWNER}/{r.name}", "description": r.description}
+                for r in dataset.values() if all(t in (r.name + " " + r.description).lower() for t in terms)]
+        return dump({"total_count": len(hits), "items": _page(hits, page, perPage)})
+
+    @mcp.tool()
+    async def get_file_contents(owner: str, repo: str, path: str = "", ref: str | None = None) -> str:
+        """Get the contents of a file or directory from a GitHub repository."""
+        await simulate()
+        r = repo_of(owner, repo)
+        if path in r.files:
+            return r.files[path]
+        prefix = path.strip("/") + "/" if path.strip("/") else ""
+        entries = sorted({p[len(prefix):].split("/")[0] for p in r.files if p.startswith(prefix)})
+        if not entries:
+            raise ToolError(f"Not Found: {path}")
+        listing = []
+        for e in entries:
+            if prefix + e in r.files:
+                text = r.files[prefix + e].encode()
+                # Same scheme as git blob ids, so unchanged files keep their sha.
+                sha = hashlib.sha1(b"blob %d\0" % len(text) + text).hexdigest()
+                listing.append({"name": e, "path": prefix + e, "type": "file", "sha": sha, "size": len(text)})
+            else:
+                listing.append({"name": e, "path": prefix + e, "type": "dir"})
+        return dump(listing)
+
+    @mcp.tool()
+    async def search_code(query: str, page: int = 1, perPage: int = 30) -> str:
+        """Search for code across GitHub repositories."""
+        await simulate()
+        hits = [{"repository": f"{OWNER}/{r.name}", "path": p}
+                for r in dataset.values() for p, text in r.files.items()
+                if p.endswith((".py", ".md")) and query.lower() in text.lower()]
+        return dump({"total_count": len(hits), "items": _page(hits, page, perPage)})
+
+    @mcp.tool()
+    async def list_issues(owner: str, repo: str, state: str = "open", labels: list[str] | None = None,
+                          page: int = 1, perPage: int = 30) -> str:
+        """List issues in a GitHub repository."""
+        await simulate()
+        issues = [i for i in repo_of(owner, repo).issues if state == "all" or i["state"] == state]
+        if labels:
+            issues = [i for i in issues if set(labels) <= {label["name"] for label in i["labels"]}]
+        return dump(_page(issues, page, perPage))
+
+    @mcp.tool()
+    async def get_issue(owner: str, repo: str, issue_number: int) -> str:
+        """Get details of a specific issue in a GitHub repository."""
+        await simulate()
+        for issue in repo_of(owner, repo).issues:
+            if issue["number"] == issue_number:
+                return dump(issue)
+        raise ToolError(f"Not Found: issue {issue_number}")
+
+    @mcp.tool()
+    async def create_issue(owner: str, repo: str, title: str, body: str = "",
+                           labels: list[str] | None = None) -> str:
+        """Create a new issue in a GitHub repository."""
+        await simulate()
+        r = repo_of(owner, repo)
+        issue = {"number": len(r.issues) + len(r.pulls) + 1, "title": title, "state": "open", "user": {"login": LOGIN},
+                 "labels": [{"name": label} for label in labels or []], "comments": 0,
+                 "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"), "body": body}
+        r.issues.append(issue)
+        return dump(issue)
+
+    @mcp.tool()
+    async def list_pull_requests(owner: str, repo: str, state: str = "open", page: int = 1, perPage: int = 30) -> str:
+        """List pull requests in a GitHub repository."""
+        await simulate()
+        pulls = [p for p in repo_of(owner, repo).pulls if state == "all" or p["state"] == state]
+        return dump(_page(pulls, page, perPage))
+
+    @mcp.tool()
+    async def get_pull_request(owner: str, repo: str, pullNumber: int) -> str:
+        """Get details of a specific pull request."""
+        await simulate()
+        for pull in repo_of(owner, repo).pulls:
+            if pull["number"] == pullNumber:
+                return dump(pull)
+        raise ToolError(f"Not Found: pull request {pullNumber}")
+
+    @mcp.tool()
+    async def list_commits(owner: str, repo: str, sha: str | None = None, page: int = 1, perPage: int = 30) -> str:
+        """Get the list of commits of a branch in a GitHub repository."""
+        await simulate()
+        return dump(_page(repo_of(owner, repo).commits, page, perPage))
+
+    @mcp.tool()
+    async def list_branches(owner: str, repo: str, page: int = 1, perPage: int = 30) -> str:
+        """List branches in a GitHub repository."""
+        await simulate()
+        return dump(_page([{"name": b} for b in repo_of(owner, repo).branches], page, perPage))
+
+    @mcp.tool()
+    async def create_or_update_file(owner: str, repo: str, path: str, content: str, message: str,
+                                    branch: str, sha: str | None = None) -> str:
+        """Create or update a single file in a GitHub repository."""
+        await simulate()
+        r = repo_of(owner, repo)
+        if branch not in r.branches:
+            raise ToolError(f"Branch not found: {branch}")
+        r.files[path] = content
+        commit_sha = f"{rng.getrandbits(160):040x}"
+        r.commits.insert(0, {"sha": commit_sha, "commit": {"message": message, "author": {"name": LOGIN}}})
+        return dump({"content": {"path": path, "sha": hashlib.sha1(content.encode()).hexdigest()},
+                     "commit": {"sha": commit_sha, "message": message}})
+
+    return mcp
+
+
+def with_http_errors(app, rate: float, status: int = 503, seed: int = 7):
+    """ASGI wrapper failing a fraction of HTTP requests outright, like an overloaded gateway."""
+    rng = random.Random(seed)
+
+    async def wrapped(scope, receive, send):
+        if scope["type"] == "http" and rate and rng.random() < rate:
+            await send({"type": "http.response.start", "status": status,
+                        "headers": [(b"content-type", b"text/plain")]})
+            await send({"type": "http.response.body", "body": b"Service Unavailable (injected)"})
+            return
+        await app(scope, receive, send)
+
+    return wrapped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repos", type=int, default=12)
+    parser.add_argument("--big-file-kb", type=int, default=512, help="approximate size of data/fixtures.json")
+    parser.add_argument("--latency", type=float, default=0.0, help="mean seconds per tool call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of tool calls that return an error")
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="fraction of HTTP requests answered 503")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    dataset = build_dataset(args.seed, args.repos, big_file_kb=args.big_file_kb)
+    mcp = build_server(dataset, args.latency, args.jitter, args.error_rate, args.host, args.port, args.seed)
+    app = with_http_errors(mcp.streamable_http_app(), args.http_error_rate, seed=args.seed)
+    print(f"Fake GitHub MCP on http://{args.host}:{args.port}/mcp with {len(dataset)} repos under {OWNER}/")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 # agent.py
 import os
 from dotenv import load_dotenv
-from agents import Agent, AsyncOpenAI, OpenAIChatCompletionsModel, SQLiteSession
+from agents import Agent, AsyncOpenAI
 from agents.run import RunConfig
 from server import github_mcp_server
+from fallback import fallback_from_spec
+from output_shaping import fetch_more
+from code_index import search_repo_code
+from sessions import SessionStore
 
 
 load_dotenv()
@@ -17,9 +21,13 @@ client = AsyncOpenAI(
     base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
 )
 
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.5-flash",
-    openai_client=client,
+# Models tried in order when one is rate limited or failing, as "provider:model,...".
+clients = {"gemini": client}
+if openai_api_key := os.getenv("OPENAI_API_KEY"):
+    clients["openai"] = AsyncOpenAI(api_key=openai_api_key)
+model = fallback_from_spec(
+    os.getenv("GITMATE_MODELS", "gemini:gemini-2.5-flash,gemini:gemini-2.0-flash,gemini:gemini-1.5-flash"),
+    clients,
 )
 
 run_config = RunConfig(
@@ -37,10 +45,15 @@ You are **GitMate**, a friendly and expert GitHub assistant.
 - Always **confirm** before making changes.
 - Use clean formatting: code blocks, tables, steps.
 - Ask for repo name if not specified.
+- To find where something is defined or used in a repo, use `search_repo_code` before reading files.
 - Be encouraging and clear.
 '''.strip(),
     model=model,
+    # fetch_more pages through tool outputs that were too large to send whole;
+    # search_repo_code answers "where is X" from a local index instead of reading files one by one.
+    tools=[fetch_more, search_repo_code],
     mcp_servers=[github_mcp_server],
 )
 
-session = SQLiteSession("github_gemini_streamlit_session")
+# One history per browser session, in a WAL-mode SQLite file; see UI.py for the session ids.
+store = SessionStore()
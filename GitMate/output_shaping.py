@@ -0,0 +1,169 @@
+# output_shaping.py
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from agents import function_tool
+from mcp.types import CallToolResult, TextContent
+from tool_cache import CACHE_DIR
+
+MAX_CHARS = int(os.getenv("GITMATE_MAX_TOOL_CHARS", "8000"))
+BLOB_TTL = float(os.getenv("GITMATE_BLOB_TTL", 24 * 3600))
+BLOB_MAX_BYTES = int(os.getenv("GITMATE_BLOB_MAX_BYTES", 256 * 1024 * 1024))
+# Pruning lists the whole directory, so writes trigger it at most this often.
+PRUNE_EVERY = 60.0
+# A blob's index records the byte offset of every STEP-th character, so a page is read by seeking.
+STEP = 4096
+SHAPED_SIZE = 256
+
+
+class BlobStore:
+    """Full tool outputs on disk, content-addressed, so the model can page through them later.
+
+    Blobs older than `ttl` are removed, and the oldest go first once the store is over `max_bytes`.
+    """
+
+    def __init__(self, path: str, ttl: float = BLOB_TTL, max_bytes: int = BLOB_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.pruned = 0.0
+        os.makedirs(path, exist_ok=True)
+        self.prune()
+
+    def put(self, text: str) -> str:
+        data = text.encode()
+        handle = hashlib.sha256(data).hexdigest()[:16]
+        path = os.path.join(self.path, handle + ".txt")
+        if not os.path.exists(path):
+            marks, at = [], 0
+            for start in range(0, len(text), STEP):
+                marks.append(at)
+                at += len(text[start:start + STEP].encode())
+            # The index goes first: a blob whose text exists always has one.
+            self._write(os.path.join(self.path, handle + ".idx"),
+                        json.dumps({"chars": len(text), "marks": marks}).encode())
+            self._write(path, data)
+        if time.time() - self.pruned >= PRUNE_EVERY:
+            self.prune()
+        return handle
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def read(self, handle: str, offset: int, limit: int) -> tuple[str, int] | None:
+        """Characters `offset` to `offset + limit` of a blob, and its length; reads only that part."""
+        if not handle.isalnum():
+            return None
+        try:
+            with open(os.path.join(self.path, handle + ".idx"), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            chars, marks = index["chars"], index["marks"]
+            if offset >= chars:
+                return "", chars
+            first, last = offset // STEP, -(-min(offset + limit, chars) // STEP)
+            with open(os.path.join(self.path, handle + ".txt"), "rb") as f:
+                f.seek(marks[first])
+                data = f.read(marks[last] - marks[first]) if last < len(marks) else f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        skip = offset - first * STEP
+        return data.decode("utf-8")[skip:skip + limit], chars
+
+    def prune(self):
+        self.pruned = time.time()
+        cutoff = self.pruned - self.ttl
+        stored = []
+        for entry in os.scandir(self.path):
+            try:
+                stat = entry.stat()
+                if stat.st_mtime < cutoff:
+                    os.remove(entry.path)
+                elif entry.name.endswith(".txt"):
+                    stored.append((stat.st_mtime, stat.st_size, entry.name[:-4]))
+            except OSError:
+                pass
+        total = sum(size for _, size, _ in stored)
+        for _, size, handle in sorted(stored):
+            if total <= self.max_bytes:
+                break
+            for suffix in (".txt", ".idx"):
+                try:
+                    os.remove(os.path.join(self.path, handle + suffix))
+                except OSError:
+                    pass
+            total -= size
+
+
+blobs = BlobStore(os.path.join(CACHE_DIR, "blobs"))
+
+
+def page(window: str, handle: str, offset: int, total: int, limit: int = MAX_CHARS) -> str:
+    """`window` (up to `limit` characters from `offset` of a `total`-character output), cut at a
+    line break when one is close, plus a footer."""
+    end = offset + len(window)
+    if end < total:
+        newline = window.rfind("\n", limit // 2)
+        if newline != -1:
+            window = window[:newline + 1]
+            end = offset + len(window)
+        window += (f"\n\n[Truncated: showing characters {offset:,}-{end:,} of {total:,}. "
+                   f'Call fetch_more(handle="{handle}", offset={end}) for the next part.]')
+    elif offset:
+        window += f"\n\n[End of output: characters {offset:,}-{end:,} of {total:,}.]"
+    return window
+
+
+def _shape(result: CallToolResult, text: str, limit: int) -> CallToolResult:
+    handle = blobs.put(text)
+    others = [c for c in result.content if not isinstance(c, TextContent)]
+    return CallToolResult(content=[TextContent(type="text", text=page(text[:limit], handle, 0, len(text), limit)),
+                                   *others],
+                          isError=result.isError)
+
+
+# Shaped results keyed by the identity of the full result. A result-cache hit returns the same
+# object, so its output isn't hashed and written again; the entry keeps the object alive.
+_shaped: OrderedDict[int, tuple[CallToolResult, CallToolResult]] = OrderedDict()
+
+
+async def shape(result: CallToolResult, limit: int = MAX_CHARS) -> CallToolResult:
+    """Replace an oversized text result with its first page; the full text goes to the blob store."""
+    texts = [c.text for c in result.content if isinstance(c, TextContent)]
+    if sum(map(len, texts)) + len(texts) - 1 <= limit:
+        return result
+    seen = _shaped.get(id(result))
+    if seen is not None and seen[0] is result:
+        _shaped.move_to_end(id(result))
+        return seen[1]
+    # Hashing and writing a large output would stall the event loop every MCP call shares.
+    shaped = await asyncio.to_thread(_shape, result, "\n".join(texts), limit)
+    _shaped[id(result)] = (result, shaped)
+    while len(_shaped) > SHAPED_SIZE:
+        _shaped.popitem(last=False)
+    return shaped
+
+
+@function_tool
+def fetch_more(handle: str, offset: int) -> str:
+    """Read more of a tool output that was truncated.
+
+    Args:
+        handle: The handle given in the truncation note.
+        offset: The character offset to continue from, as given in the truncation note.
+    """
+    if offset < 0:
+        offset = 0
+    found = blobs.read(handle, offset, MAX_CHARS)
+    if found is None:
+        return f"No stored output with handle {handle!r}; it may have expired. Run the original tool again."
+    window, total = found
+    if offset >= total:
+        return f"Offset {offset} is past the end of the output ({total:,} characters)."
+    return page(window, handle, offset, total)
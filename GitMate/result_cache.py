@@ -0,0 +1,136 @@
+# result_cache.py
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+from mcp.types import CallToolResult
+
+DEFAULT_TTL = float(os.getenv("GITMATE_TOOL_CACHE_TTL", "60"))
+
+# Read-only GitHub MCP tools whose results may be reused, with their TTL in seconds.
+READ_ONLY_TOOLS = {
+    "get_me": 600,
+    "get_file_contents": DEFAULT_TTL,
+    "get_repository_tree": DEFAULT_TTL,
+    "list_branches": DEFAULT_TTL,
+    "list_tags": DEFAULT_TTL,
+    "list_commits": DEFAULT_TTL,
+    "get_commit": 600,
+    "list_issues": 30,
+    "get_issue": 30,
+    "get_issue_comments": 30,
+    "search_issues": 30,
+    "list_pull_requests": 30,
+    "get_pull_request": 30,
+    "get_pull_request_files": DEFAULT_TTL,
+    "get_pull_request_diff": DEFAULT_TTL,
+    "get_pull_request_comments": 30,
+    "get_pull_request_reviews": 30,
+    "get_pull_request_status": 30,
+    "search_repositories": 120,
+    "search_code": 120,
+    "search_users": 120,
+}
+
+
+def repo_key(arguments: dict | None) -> str | None:
+    """`owner/repo` a call is about, if its arguments name one."""
+    if not arguments or "owner" not in arguments or "repo" not in arguments:
+        return None
+    return f"{arguments['owner']}/{arguments['repo']}".lower()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+
+class ToolResultCache:
+    """Caches results of read-only MCP tool calls, keyed on tool name plus canonical arguments.
+
+    Any other (write) tool call on a repository drops that repository's cached reads and the
+    reads tied to no repository (searches span repositories); a write that names no repository
+    drops everything. Writes invalidate even when they fail or time out, since they may have
+    reached GitHub anyway. A read that was in flight while an invalidation happened is returned
+    but not cached: each repository has a generation counter, and the read's result is only
+    stored if the counter it started with is unchanged.
+    """
+
+    def __init__(self, ttls: dict[str, float] = READ_ONLY_TOOLS, max_entries: int = 1024):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, tuple[float, str | None, CallToolResult]] = OrderedDict()
+        self.by_repo: dict[str | None, set[str]] = {}
+        self.generations: dict[str | None, int] = {}
+        self.global_generation = 0
+        self.stats = CacheStats()
+
+    @staticmethod
+    def key(tool_name: str, arguments: dict | None) -> str:
+        return tool_name + ":" + json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"))
+
+    async def call(self, tool_name: str, arguments: dict | None,
+                   fetch: Callable[[], Awaitable[CallToolResult]]) -> CallToolResult:
+        ttl = self.ttls.get(tool_name)
+        if ttl is None:
+            try:
+                return await fetch()
+            finally:
+                self.invalidate(repo_key(arguments))
+
+        key = self.key(tool_name, arguments)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[2]
+
+        self.stats.misses += 1
+        repo = repo_key(arguments)
+        started = self._generation(repo)
+        result = await fetch()
+        if not result.isError and self._generation(repo) == started:
+            self._store(key, repo, ttl, result)
+        return result
+
+    def _generation(self, repo: str | None) -> tuple[int, int]:
+        return self.generations.get(repo, 0), self.global_generation
+
+    def _store(self, key: str, repo: str | None, ttl: float, result: CallToolResult):
+        self.entries[key] = (time.monotonic() + ttl, repo, result)
+        self.entries.move_to_end(key)
+        self.by_repo.setdefault(repo, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            old_key, (_, old_repo, _) = self.entries.popitem(last=False)
+            self.by_repo.get(old_repo, set()).discard(old_key)
+
+    def invalidate(self, repo: str | None):
+        """Drop cached reads of one repository (and repository-less ones), or everything when the repository is unknown."""
+        if repo is None:
+            self.global_generation += 1
+            dropped = len(self.entries)
+            self.entries.clear()
+            self.by_repo.clear()
+        else:
+            dropped = 0
+            for bucket in (repo, None):
+                self.generations[bucket] = self.generations.get(bucket, 0) + 1
+                keys = self.by_repo.pop(bucket, set())
+                dropped += len(keys)
+                for key in keys:
+                    self.entries.pop(key, None)
+        if dropped:
+            self.stats.invalidations += 1
+
+    def summary(self) -> dict[str, Any]:
+        return {"entries": len(self.entries), "hits": self.stats.hits, "misses": self.stats.misses,
+                "hit_rate": round(self.stats.hit_rate, 3), "invalidations": self.stats.invalidations}
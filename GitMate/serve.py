@@ -0,0 +1,52 @@
+"""Start GitMate with warm-up and a readiness endpoint.
+
+Streamlit only runs UI.py when the first browser connects, so the first user would pay for
+connecting to MCP, fetching tools and opening the model connection. This starts the warm-up
+as soon as the process starts, then runs the Streamlit server in the same process (UI.py
+reuses the already imported modules).
+
+GET /ready on GITMATE_READY_PORT (default 8502) returns 200 once warm-up has finished with
+every step succeeding, and 503 otherwise, for use as a deployment readiness probe.
+
+    python serve.py [streamlit options, e.g. --server.port 8501]
+"""
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from streamlit.web import cli
+from warmup import warmup
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+READY_PORT = int(os.getenv("GITMATE_READY_PORT", "8502"))
+
+
+class ReadyHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/ready":
+            self.send_error(404)
+            return
+        ready = warmup.ready.is_set()
+        body = json.dumps({"ready": ready, "finished": warmup.done.is_set(), "timings": warmup.timings,
+                           "errors": warmup.errors}).encode()
+        self.send_response(200 if ready else 503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    server = ThreadingHTTPServer(("0.0.0.0", READY_PORT), ReadyHandler)
+    threading.Thread(target=server.serve_forever, name="readiness", daemon=True).start()
+
+    # Same as `streamlit run UI.py ...`, but in this process, where warm-up is already running.
+    cli.main(["run", os.path.join(HERE, "UI.py"), *sys.argv[1:]], prog_name="streamlit")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,124 @@
-# server.py
-import os
-from dotenv import load_dotenv
-from agents.mcp import MCPServerStreamableHttp
-
-load_dotenv()
-
-MCP_TOKEN = os.getenv("MCP_TOKEN")
-if not MCP_TOKEN:
-    raise ValueError("MCP_TOKEN missing in .env")
-
-github_mcp_server = MCPServerStreamableHttp(
-    name="GitHub MCP",
-    params={
-        "url": "https://api.githubcopilot.com/mcp/",
-        "headers": {"Authorization": f"Bearer {MCP_TOKEN}"},
-        "timeout": 60,               
-    },
-    cache_tools_list=True,
-    max_retry_attempts=5,
-)
+# server.py
+import asyncio
+import hashlib
+import os
+from typing import Any
+from dotenv import load_dotenv
+from agents.mcp import MCPServerStreamableHttp
+from dispatch import ToolCallLimiter
+from output_shaping import shape
+from result_cache import ToolResultCache
+from tool_cache import CACHE_DIR, ToolListCache
+from tool_selector import select_tools
+
+load_dotenv()
+
+GITHUB_MCP_URL = "https://api.githubcopilot.com/mcp/"
+# Point at another server, e.g. the local fake_github_mcp.py, for offline runs and benchmarks.
+MCP_URL = os.getenv("MCP_URL", GITHUB_MCP_URL)
+
+MCP_TOKEN = os.getenv("MCP_TOKEN")
+if not MCP_TOKEN and MCP_URL == GITHUB_MCP_URL:
+    raise ValueError("MCP_TOKEN missing in .env")
+
+
+class GitHubMCPServer(MCPServerStreamableHttp):
+    """Streamable-HTTP MCP server whose tool list is served from a disk cache.
+
+    `list_tools()` returns the cached list right away; once it is older than the TTL a
+    refresh runs in the background and the stale list keeps being served until it lands.
+    """
+
+    def __init__(self, *args, tool_cache: ToolListCache, result_cache: ToolResultCache | None = None,
+                 limiter: ToolCallLimiter | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tool_cache = tool_cache
+        self.result_cache = result_cache or ToolResultCache()
+        self.limiter = limiter or ToolCallLimiter()
+        # From openai-agents 0.14 the base class funnels every request on the session through one
+        # lock, so the tool calls of a turn ran one after another. Streamable HTTP multiplexes
+        # requests by id; the limiter bounds the concurrency instead. The SDK has no public switch
+        # for this, so an SDK that locks without the private one is refused rather than run slowly.
+        if hasattr(self, "_request_lock"):
+            if not hasattr(self, "_serialize_session_requests"):
+                raise RuntimeError("This openai-agents version serializes MCP requests without the "
+                                   "_serialize_session_requests switch; pin the version in pyproject.toml.")
+            self._serialize_session_requests = False
+        self._refresh_task: asyncio.Task | None = None
+        if tool_cache.tools is not None:
+            self._tools_list = tool_cache.tools
+            self._cache_dirty = False
+
+    async def connect(self):
+        await super().connect()
+        if self.tool_cache.stale():
+            self.refresh_in_background()
+
+    async def list_tools(self, run_context: Any = None, agent: Any = None):
+        if self.tool_cache.tools is None or self._cache_dirty:
+            await self.refresh_tools()
+        elif self.tool_cache.stale():
+            self.refresh_in_background()
+        if run_context is None or agent is None:
+            # Outside a run (e.g. the Tools page) there is no message to filter by.
+            return self.tool_cache.tools
+        return await super().list_tools(run_context, agent)
+
+    async def refresh_tools(self):
+        """Fetch the tool list from the server and persist it."""
+        if self.session is None:
+            raise ConnectionError("GitHub MCP session is not connected.")
+        tools = (await self.session.list_tools()).tools
+        self.tool_cache.update(tools)
+        self._tools_list = tools
+        self._cache_dirty = False
+        return tools
+
+    def refresh_in_background(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh_tools()
+        except Exception:
+            # The cached list keeps being served; the next stale read tries again.
+            pass
+
+    async def call_tool(self, tool_name: str, arguments: dict[str, Any] | None, *args, **kwargs):
+        # Oversized outputs reach the model (and the session history) as a first page only.
+        return await shape(await self.fetch_tool(tool_name, arguments, *args, **kwargs))
+
+    async def fetch_tool(self, tool_name: str, arguments: dict[str, Any] | None, *args, **kwargs):
+        """Call a tool and return its full result, for code that reads outputs itself."""
+        # Read-only tools are answered from the result cache; write tools invalidate their repo.
+        # Only calls that actually go to the server take a concurrency slot.
+        call = super().call_tool
+        return await self.result_cache.call(
+            tool_name, arguments,
+            lambda: self.limiter.run(tool_name, lambda: call(tool_name, arguments, *args, **kwargs), arguments),
+        )
+
+    def cached_tools(self) -> list[dict]:
+        """The cached tools as plain dicts, without touching the network."""
+        return [t.model_dump() for t in self.tool_cache.tools or []]
+
+
+github_mcp_server = GitHubMCPServer(
+    name="GitHub MCP",
+    params={
+        "url": MCP_URL,
+        "headers": {"Authorization": f"Bearer {MCP_TOKEN}"} if MCP_TOKEN else {},
+        "timeout": 60,
+    },
+    cache_tools_list=True,
+    max_retry_attempts=5,
+    # Only the tools relevant to the current message are sent to the model.
+    tool_filter=select_tools,
+    tool_cache=ToolListCache(
+        # Another server's tools must not overwrite the cached GitHub list.
+        os.path.join(CACHE_DIR, "mcp_tools.json" if MCP_URL == GITHUB_MCP_URL
+                     else f"mcp_tools_{hashlib.sha256(MCP_URL.encode()).hexdigest()[:12]}.json"),
+        ttl=float(os.getenv("GITMATE_TOOLS_TTL", 6 * 3600)),
+    ),
+)
@@ -0,0 +1,207 @@
+# sessions.py
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable
+from agents import SessionABC, TResponseInputItem
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.getenv("GITMATE_SESSION_DB", os.path.join(HERE, ".data", "sessions.db"))
+# Every browser tab starts a session, so idle ones are deleted after this long.
+SESSION_TTL = float(os.getenv("GITMATE_SESSION_TTL", 7 * 24 * 3600))
+PRUNE_EVERY = 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS agent_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    message_data TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES agent_sessions (session_id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_agent_messages_session_id ON agent_messages (session_id, id);
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    # WAL lets readers run while the writer commits; NORMAL sync is safe in WAL mode.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+class SessionStore:
+    """File-backed SQLite store for every user's GitMate history.
+
+    Reads use a small pool of connections and run concurrently under WAL. All writes go to a
+    single writer thread that drains whatever is queued and commits it in one transaction, so
+    concurrent users share commits instead of queuing on SQLite's write lock. The writer also
+    deletes sessions not updated for `session_ttl` seconds, at startup and then hourly.
+    """
+
+    def __init__(self, path: str = DB_PATH, pool_size: int = 4, max_batch: int = 256,
+                 session_ttl: float = SESSION_TTL):
+        self.path = path
+        self.max_batch = max_batch
+        self.session_ttl = session_ttl
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._writer = connect(path)
+        self._writer.executescript(SCHEMA)
+        self._writer.commit()
+        self._pool: queue.Queue[sqlite3.Connection] = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(connect(path))
+        self._jobs: queue.Queue[tuple[Callable[[sqlite3.Connection], Any], Future]] = queue.Queue()
+        self.commits = 0
+        self.batched_writes = 0
+        self.pruned_sessions = 0
+        self._next_prune = 0.0
+        threading.Thread(target=self._write_loop, name="session-writer", daemon=True).start()
+
+    def session(self, session_id: str) -> "GitMateSession":
+        return GitMateSession(session_id, self)
+
+    @contextmanager
+    def _reader(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    async def read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        def run():
+            with self._reader() as conn:
+                return fn(conn)
+        return await asyncio.to_thread(run)
+
+    async def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Queue `fn(conn)` for the writer thread and wait until its batch is committed."""
+        future: Future = Future()
+        self._jobs.put((fn, future))
+        return await asyncio.wrap_future(future)
+
+    def _prune(self):
+        """Delete sessions idle for longer than `session_ttl`, with their messages."""
+        self._next_prune = time.monotonic() + PRUNE_EVERY
+        idle = "(SELECT session_id FROM agent_sessions WHERE updated_at < datetime('now', ?))"
+        cutoff = f"-{int(self.session_ttl)} seconds"
+        try:
+            with self._writer:
+                # Foreign keys are off, so the cascade doesn't fire; the messages go first, explicitly.
+                self._writer.execute(f"DELETE FROM agent_messages WHERE session_id IN {idle}", (cutoff,))
+                deleted = self._writer.execute(f"DELETE FROM agent_sessions WHERE session_id IN {idle}",
+                                               (cutoff,)).rowcount
+        except sqlite3.Error:
+            return
+        self.pruned_sessions += deleted
+
+    def _write_loop(self):
+        while True:
+            if time.monotonic() >= self._next_prune:
+                self._prune()
+            try:
+                batch = [self._jobs.get(timeout=PRUNE_EVERY)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
+            # Callers whose wait was cancelled have gone; the rest can no longer be cancelled.
+            batch = [(fn, future) for fn, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            done = []
+            try:
+                self._writer.execute("BEGIN")
+                for fn, future in batch:
+                    # Each job in its own savepoint: a failing job is undone alone, not the batch.
+                    self._writer.execute("SAVEPOINT job")
+                    try:
+                        result = fn(self._writer)
+                    except Exception as e:
+                        self._writer.execute("ROLLBACK TO job")
+                        self._writer.execute("RELEASE job")
+                        future.set_exception(e)
+                        continue
+                    self._writer.execute("RELEASE job")
+                    done.append((future, result))
+                self._writer.commit()
+            except Exception as e:
+                if self._writer.in_transaction:
+                    self._writer.rollback()
+                for future, _ in done:
+                    future.set_exception(e)
+                continue
+            self.commits += 1
+            self.batched_writes += len(done)
+            for future, result in done:
+                future.set_result(result)
+
+
+class GitMateSession(SessionABC):
+    """One user's conversation history in a SessionStore."""
+
+    def __init__(self, session_id: str, store: SessionStore):
+        self.session_id = session_id
+        self.store = store
+
+    async def get_items(self, limit: int | None = None) -> list[TResponseInputItem]:
+        def fetch(conn: sqlite3.Connection):
+            if limit is None:
+                rows = conn.execute(
+                    "SELECT message_data FROM agent_messages WHERE session_id = ? ORDER BY id",
+                    (self.session_id,),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT message_data FROM agent_messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                    (self.session_id, limit),
+                ).fetchall()[::-1]
+            return [json.loads(data) for (data,) in rows]
+        return await self.store.read(fetch)
+
+    async def add_items(self, items: list[TResponseInputItem]) -> None:
+        if not items:
+            return
+        rows = [(self.session_id, json.dumps(item)) for item in items]
+
+        def insert(conn: sqlite3.Connection):
+            conn.execute("INSERT OR IGNORE INTO agent_sessions (session_id) VALUES (?)", (self.session_id,))
+            conn.executemany("INSERT INTO agent_messages (session_id, message_data) VALUES (?, ?)", rows)
+            conn.execute("UPDATE agent_sessions SET updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
+                         (self.session_id,))
+        await self.store.write(insert)
+
+    async def pop_item(self) -> TResponseInputItem | None:
+        def pop(conn: sqlite3.Connection):
+            row = conn.execute(
+                "DELETE FROM agent_messages WHERE id = "
+                "(SELECT id FROM agent_messages WHERE session_id = ? ORDER BY id DESC LIMIT 1) "
+                "RETURNING message_data",
+                (self.session_id,),
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+        return await self.store.write(pop)
+
+    async def clear_session(self) -> None:
+        def clear(conn: sqlite3.Connection):
+            conn.execute("DELETE FROM agent_messages WHERE session_id = ?", (self.session_id,))
+            conn.execute("DELETE FROM agent_sessions WHERE session_id = ?", (self.session_id,))
+        await self.store.write(clear)
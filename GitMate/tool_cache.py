@@ -0,0 +1,70 @@
+# tool_cache.py
+import hashlib
+import json
+import os
+import tempfile
+import time
+from mcp.types import Tool as MCPTool
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, ".cache")
+
+
+def tools_hash(tools: list[dict]) -> str:
+    """Content hash of a tool list, independent of key order."""
+    return hashlib.sha256(json.dumps(tools, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+class ToolListCache:
+    """The MCP `list_tools()` result persisted to disk with a TTL and a content hash.
+
+    The file is loaded at startup so the first turn and the Tools page never wait on the
+    server. A stale list is still served while a refresh runs in the background.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.tools: list[MCPTool] | None = None
+        self.hash: str | None = None
+        self.fetched_at = 0.0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        raw = data.get("tools", [])
+        # A file whose content doesn't match its hash was truncated or edited; ignore it.
+        if data.get("hash") != tools_hash(raw):
+            return
+        try:
+            self.tools = [MCPTool.model_validate(t) for t in raw]
+        except ValueError:
+            return
+        self.hash = data["hash"]
+        self.fetched_at = data.get("fetched_at", 0.0)
+
+    def stale(self) -> bool:
+        return self.tools is None or time.time() - self.fetched_at > self.ttl
+
+    def update(self, tools: list[MCPTool]) -> bool:
+        """Store a freshly fetched list. Returns whether the tools actually changed."""
+        raw = [t.model_dump(mode="json", exclude_none=True) for t in tools]
+        new_hash = tools_hash(raw)
+        changed = new_hash != self.hash
+        self.tools = tools
+        self.hash = new_hash
+        self.fetched_at = time.time()
+        self._write({"hash": new_hash, "fetched_at": self.fetched_at, "tools": raw})
+        return changed
+
+    def _write(self, data: dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Write to a temp file and rename, so a crash never leaves a half-written cache.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
@@ -0,0 +1,146 @@
+# tool_selector.py
+import json
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from mcp.types import Tool as MCPTool
+from agents.mcp import ToolFilterContext
+from result_cache import READ_ONLY_TOOLS
+
+TOP_K = int(os.getenv("GITMATE_TOOL_TOP_K", "12"))
+
+# Offered when a message matches nothing, e.g. "hi" or "what can you do?".
+DEFAULT_TOOLS = ("get_me", "search_repositories", "get_file_contents", "list_issues", "list_pull_requests")
+
+STOPWORDS = {"a", "an", "and", "are", "at", "be", "by", "can", "do", "for", "from", "how", "i", "in", "is",
+             "it", "my", "of", "on", "or", "please", "show", "that", "the", "this", "to", "what", "with", "you"}
+
+SYNONYMS = {
+    "pr": ["pull", "request"],
+    "prs": ["pull", "request"],
+    "repo": ["repository"],
+    "readme": ["file", "content"],
+    "bug": ["issue"],
+    "ticket": ["issue"],
+    "code": ["file", "content", "search"],
+    "label": ["label", "issue"],
+    "review": ["review", "pull", "request"],
+    "merge": ["merge", "pull", "request"],
+    "me": ["me", "user"],
+}
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower().replace("_", " ")):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.extend(SYNONYMS.get(word, [word]))
+    return tokens
+
+
+def schema_tokens(tool: MCPTool) -> int:
+    """Rough prompt-token cost of sending one tool definition (about four characters per token)."""
+    definition = {"name": tool.name, "description": tool.description, "parameters": tool.inputSchema}
+    return len(json.dumps(definition)) // 4
+
+
+@dataclass
+class TurnContext:
+    """Per-turn run context: the user's message and the tools this session used recently.
+
+    Passed as `context=` to Runner.run; the MCP tool filter reads it to pick the subset.
+    With `read_only`, only read-only tools are offered (used by the bulk planner).
+    """
+
+    query: str
+    recent_tools: list[str] = field(default_factory=list)
+    read_only: bool = False
+    selected: set[str] | None = None
+    tools_total: int = 0
+    tokens_total: int = 0
+    tokens_sent: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_total - self.tokens_sent
+
+
+class ToolSelector:
+    """BM25 index over tool names, descriptions and parameter names. No embeddings, no network."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.key: tuple | None = None
+        self.tools: list[MCPTool] = []
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        self.lengths: list[int] = []
+        self.avg_length = 0.0
+        self.costs: dict[str, int] = {}
+
+    def index(self, tools: list[MCPTool]):
+        key = tuple(t.name for t in tools)
+        if key == self.key:
+            return
+        self.key = key
+        self.tools = tools
+        self.postings = {}
+        self.lengths = []
+        for i, tool in enumerate(tools):
+            params = " ".join((tool.inputSchema or {}).get("properties", {}).keys())
+            # Name tokens count double: they are the most specific signal.
+            terms = Counter(tokenize(tool.name) * 2 + tokenize(tool.description or "") + tokenize(params))
+            self.lengths.append(sum(terms.values()))
+            for term, freq in terms.items():
+                self.postings.setdefault(term, []).append((i, freq))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        self.costs = {t.name: schema_tokens(t) for t in tools}
+
+    def scores(self, query: str) -> dict[int, float]:
+        n = len(self.tools)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, freq in postings:
+                norm = freq + self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * freq * (self.k1 + 1) / norm
+        return scores
+
+    def select(self, query: str, tools: list[MCPTool], recent: list[str], k: int = TOP_K) -> set[str]:
+        self.index(tools)
+        names = {t.name for t in tools}
+        ranked = sorted(self.scores(query).items(), key=lambda item: -item[1])
+        selected = {self.tools[i].name for i, _ in ranked[:k]}
+        if not selected:
+            selected = {name for name in DEFAULT_TOOLS if name in names}
+        # Tools the session has just used are likely to be needed again ("now do the same for...").
+        selected.update(name for name in recent if name in names)
+        return selected
+
+
+selector = ToolSelector()
+
+
+def select_tools(context: ToolFilterContext, tool: MCPTool) -> bool:
+    """MCP tool filter: keep only the tools picked for this turn's message."""
+    turn = context.run_context.context
+    if not isinstance(turn, TurnContext):
+        return True
+    if turn.read_only and tool.name not in READ_ONLY_TOOLS:
+        return False
+    if turn.selected is None:
+        server = next(s for s in context.agent.mcp_servers if s.name == context.server_name)
+        tools = server.tool_cache.tools or [tool]
+        turn.selected = selector.select(turn.query, tools, turn.recent_tools)
+        turn.tools_total = len(tools)
+        turn.tokens_total = sum(selector.costs.get(t.name, 0) for t in tools)
+        turn.tokens_sent = sum(selector.costs.get(name, 0) for name in turn.selected)
+    return tool.name in turn.selected
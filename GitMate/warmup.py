@@ -0,0 +1,93 @@
+# warmup.py
+import asyncio
+import os
+import threading
+import time
+from openai import APIStatusError
+from connection import connection
+from main import clients, model
+from server import github_mcp_server
+from tool_selector import selector
+
+# Also send a one-token completion, so the first user's request doesn't hit a cold model route.
+PRIME_MODEL = os.getenv("GITMATE_WARMUP_PRIME", "0") == "1"
+TIMEOUT = float(os.getenv("GITMATE_WARMUP_TIMEOUT", "90"))
+
+
+class Warmup:
+    """Gets the process ready before the first user arrives.
+
+    Connects the MCP session, loads (and if needed fetches) the tool list and builds the tool
+    selector's index, and opens the model clients' connection pools, all on the MCP loop where
+    turns later run. The steps run independently, so a failed MCP connect doesn't skip the
+    model warm-up. `done` is set when they have all finished; `ready` only if none failed.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ready = threading.Event()
+        self.timings: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self.started = time.monotonic()
+
+    def start(self):
+        # Straight onto the loop: connection.submit() would wait for MCP before running anything.
+        future = asyncio.run_coroutine_threadsafe(self.run(), connection.loop)
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            error = future.exception()
+            self.errors["warmup"] = f"{type(error).__name__}: {error}"
+        if not self.errors:
+            self.ready.set()
+        self.done.set()
+
+    async def _step(self, name: str, coro):
+        start = time.monotonic()
+        try:
+            await coro
+        except Exception as e:
+            self.errors[name] = f"{type(e).__name__}: {e}"
+        self.timings[name] = time.monotonic() - start
+
+    async def run(self):
+        steps = [self._step("mcp", self._mcp()), self._step("model", self._models())]
+        if PRIME_MODEL:
+            steps.append(self._step("prime", self._prime()))
+        await asyncio.gather(*steps)
+        self.timings["total"] = time.monotonic() - self.started
+
+    async def _mcp(self):
+        await connection.wait_ready()
+        tools = await github_mcp_server.list_tools()
+        selector.index(tools)
+
+    async def _models(self):
+        # Any cheap authenticated request opens the TLS connection the client then keeps pooled.
+        await asyncio.gather(*(self._open(client) for client in clients.values()))
+
+    @staticmethod
+    async def _open(client):
+        try:
+            await client.models.list()
+        except APIStatusError as e:
+            # Any answer means the connection is open; only a rejected key is a real failure.
+            if e.status_code in (401, 403):
+                raise
+
+    async def _prime(self):
+        provider, _, name = model.tiers[0].name.partition(":")
+        await clients[provider].chat.completions.create(
+            model=name, messages=[{"role": "user", "content": "ping"}], max_tokens=1,
+        )
+
+    def wait(self, timeout: float = TIMEOUT) -> bool:
+        """Wait for warm-up to finish; whether it succeeded."""
+        self.done.wait(timeout)
+        return self.ready.is_set()
+
+
+# Started once per process, on first import (serve.py imports it before Streamlit starts).
+warmup = Warmup()
+warmup.start()
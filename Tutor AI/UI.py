@@ -5,45 +5,70 @@ import json
 from agents import Runner
 
 # Import agent, config, and session from main.py
-from main import agent, config, session, UPLOADS_DIR
+from main import agent, config, session, UPLOADS_DIR, ingestion
+from fallback import served_tiers
+from history import ChatLog
 
 # The session ID is now implicitly handled by the imported session object from main.py
 SESSION_ID = session.session_id 
 
-# === Chat History File ===
-CHAT_HISTORY_FILE = f"{SESSION_ID}_messages.json"
+# === Chat History ===
+# The chat shows the agent session's own history; there is no separate display copy.
+# Messages loaded when the page opens; older ones stay on disk.
+HISTORY_LOAD_LIMIT = int(os.getenv("CHAT_HISTORY_LOAD", "500"))
+# Display-only histories written by earlier versions, imported into the session once.
+LEGACY_HISTORY_FILES = [f"{SESSION_ID}_messages.jsonl", f"{SESSION_ID}_messages.json"]
+
+@st.cache_resource
+def import_legacy_history():
+    for path in LEGACY_HISTORY_FILES:
+        if not os.path.exists(path):
+            continue
+        try:
+            if path.endswith(".jsonl"):
+                legacy_log = ChatLog(path)
+                legacy = legacy_log.entries()
+                legacy_log.close()
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+            if not session.log.tail(1):
+                session.log.append(*({"role": m["role"], "content": m["content"]} for m in legacy))
+        except (OSError, ValueError, KeyError):
+            pass
+        os.remove(path)
 
 def load_chat_history():
-    """Load chat history from JSON file, tolerating empty/corrupt files."""
+    """Load the most recent chat messages from the session."""
     try:
-        if os.path.exists(CHAT_HISTORY_FILE):
-            # If file exists but is empty, return empty history
-            try:
-                if os.path.getsize(CHAT_HISTORY_FILE) == 0:
-                    return []
-            except Exception:
-                return []
-
-            with open(CHAT_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except json.JSONDecodeError:
-        # Corrupt or partial file – reset history gracefully
-        try:
-            os.remove(CHAT_HISTORY_FILE)
-        except Exception:
-            pass
-        return []
+        return session.messages(HISTORY_LOAD_LIMIT)
     except Exception as e:
         st.warning(f"Could not load chat history: {e}")
     return []
 
-def save_chat_history(messages):
-    """Save chat history to JSON file"""
-    try:
-        with open(CHAT_HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(messages, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        st.warning(f"Could not save chat history: {e}")
+import_legacy_history()
+
+# Messages shown at once; "Load earlier" adds another window's worth.
+CHAT_WINDOW = int(os.getenv("CHAT_WINDOW", "30"))
+
+def _load_earlier():
+    st.session_state.chat_window = st.session_state.get("chat_window", CHAT_WINDOW) + CHAT_WINDOW
+
+@st.fragment
+def render_history(messages):
+    """Show the last messages, with a pager for earlier ones.
+
+    Each rerun costs O(window) rather than O(history). A fragment, so paging back only reruns
+    this part of the page.
+    """
+    shown = st.session_state.setdefault("chat_window", CHAT_WINDOW)
+    start = max(0, len(messages) - shown)
+    if start:
+        st.button(f"⬆️ Load earlier messages ({start} more)", key="chat_load_earlier",
+                  on_click=_load_earlier, use_container_width=True)
+    for message in messages[start:]:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
 
 # === Streamlit UI ===
 st.set_page_config(page_title="AI Tutor", page_icon="🎓", layout="centered")
@@ -55,15 +80,12 @@ st.caption("Your AI-powered study companion 🤖")
 if "messages" not in st.session_state:
     st.session_state.messages = load_chat_history()
 
-# Display chat messages
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# Display the latest chat messages; earlier ones load on demand
+render_history(st.session_state.messages)
 
 # Chat input
 if prompt := st.chat_input("Ask a question, request a quiz, or explain a concept..."):
     st.session_state.messages.append({"role": "user", "content": prompt})
-    save_chat_history(st.session_state.messages)
     with st.chat_message("user"):
         st.markdown(prompt)
 
@@ -72,6 +94,9 @@ if prompt := st.chat_input("Ask a question, request a quiz, or explain a concept
             message_placeholder = st.empty()
             message_placeholder.markdown("Generating response...")
 
+            # Filled by the fallback model with the tier that served each model call.
+            tiers = []
+            served_tiers.set(tiers)
             try:
                 result = asyncio.run(
                     Runner.run(
@@ -86,10 +111,24 @@ if prompt := st.chat_input("Ask a question, request a quiz, or explain a concept
                 response = f"Error: {str(e)}"
                 st.error("Agent failed to respond.")
 
+            reply = {"role": "assistant", "content": response}
             message_placeholder.markdown(response)
+            if tiers:
+                st.caption(f"Answered by {tiers[-1]}")
+
+    # Runner.run already saved the turn to the session; this only updates the page.
+    st.session_state.messages.append(reply)
 
-    st.session_state.messages.append({"role": "assistant", "content": response})
-    save_chat_history(st.session_state.messages)
+STATE_ICONS = {"queued": "⏳", "processing": "⚙️", "summarizing": "📝", "ready": "✅", "failed": "⚠️"}
+
+@st.fragment(run_every=1.0)
+def upload_status():
+    """Per-file ingestion state; a fragment, so polling while files are processed doesn't rerun the page."""
+    for status in ingestion.statuses():
+        line = f"{STATE_ICONS.get(status.state, '•')} `{status.filename}` — {status.state}"
+        if status.state == "failed":
+            line += f": {status.error}"
+        st.caption(line)
 
 # === Sidebar ===
 with st.sidebar:
@@ -121,22 +160,21 @@ with st.sidebar:
     if uploaded_file is not None:
         if not os.path.exists(UPLOADS_DIR):
             os.makedirs(UPLOADS_DIR)
-        file_path = os.path.join(UPLOADS_DIR, uploaded_file.name)
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getvalue())
+        # The uploader keeps returning the file on every rerun; save and index each upload once.
+        if st.session_state.get("saved_upload") != uploaded_file.file_id:
+            # Encoding, normalizing, indexing and a summary run in the background.
+            ingestion.save(uploaded_file.name, uploaded_file.getvalue())
+            st.session_state.saved_upload = uploaded_file.file_id
         st.success(f"File '{uploaded_file.name}' uploaded. You can now ask questions about it.")
 
+    upload_status()
+
     st.divider()
 
     st.caption(f"Session ID: `{SESSION_ID}`")
     if st.button("Clear Chat History"):
         st.session_state.messages = []
 
-        db_file = f"{SESSION_ID}.db"
-        if os.path.exists(db_file):
-            os.remove(db_file)
-
-        if os.path.exists(CHAT_HISTORY_FILE):
-            os.remove(CHAT_HISTORY_FILE)
+        asyncio.run(session.clear_session())
         st.success("History cleared!")
         st.rerun()
\ No newline at end of file
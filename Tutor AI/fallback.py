@@ -0,0 +1,190 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI
+from agents import Model, OpenAIChatCompletionsModel
+
+# Set this to a list before a run to collect the tier that served each model call.
+served_tiers: ContextVar[list | None] = ContextVar("served_tiers", default=None)
+
+
+def is_fallback_error(error: Exception) -> bool:
+    """Rate limits, server errors and connection failures move on to the next tier."""
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, APIConnectionError)
+
+
+@dataclass
+class CircuitBreaker:
+    """Skips a tier after repeated failures, then lets one probe request through after a cooldown."""
+
+    failure_threshold: int = 3
+    cooldown: float = 30.0
+    failures: int = 0
+    opened_at: float | None = None
+    probing: bool = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.probing else "open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if not self.probing and time.monotonic() - self.opened_at >= self.cooldown:
+            # Half-open: this request is the recovery probe.
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+    def release(self):
+        """The request failed for a reason unrelated to the tier's health."""
+        self.probing = False
+
+
+@dataclass
+class Tier:
+    name: str
+    model: Model
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    served: int = 0
+    failed: int = 0
+    total_latency: float = 0.0
+
+
+class FallbackModel(Model):
+    """A Model that tries an ordered list of models/providers, moving on when one is throttled or down."""
+
+    def __init__(self, tiers: list[Tier]):
+        if not tiers:
+            raise ValueError("FallbackModel needs at least one tier.")
+        self.tiers = tiers
+
+    def _candidates(self):
+        """Tiers to try, in order.
+
+        Each breaker is asked only when its tier is about to be tried: `allow()` claims the
+        half-open probe, which a tier skipped because an earlier one answered would never release.
+        """
+        tried = False
+        for tier in self.tiers:
+            if tier.breaker.allow():
+                tried = True
+                yield tier
+        # With every breaker open, still try the first tier rather than failing outright.
+        if not tried:
+            yield self.tiers[0]
+
+    def _served(self, tier: Tier, started: float):
+        tier.breaker.record_success()
+        tier.served += 1
+        tier.total_latency += time.monotonic() - started
+        record = served_tiers.get()
+        if record is not None:
+            record.append(tier.name)
+
+    def _failed(self, tier: Tier, error: Exception) -> bool:
+        """Record a failure and return whether the next tier should be tried."""
+        if not is_fallback_error(error):
+            tier.breaker.release()
+            return False
+        tier.failed += 1
+        tier.breaker.record_failure()
+        return True
+
+    def _abandoned(self, tier: Tier):
+        """The call was cancelled or its stream closed early: nothing was learned about the tier.
+
+        Without this a half-open probe that never finishes keeps `probing` set, and the tier
+        is skipped until the process restarts.
+        """
+        tier.breaker.release()
+
+    async def get_response(self, *args, **kwargs):
+        last_error = None
+        for tier in self._candidates():
+            started = time.monotonic()
+            settled = False
+            try:
+                response = await tier.model.get_response(*args, **kwargs)
+            except Exception as e:
+                settled = True
+                if not self._failed(tier, e):
+                    raise
+                last_error = e
+            else:
+                settled = True
+                self._served(tier, started)
+                return response
+            finally:
+                if not settled:
+                    self._abandoned(tier)
+        raise last_error
+
+    async def stream_response(self, *args, **kwargs):
+        last_error = None
+        for tier in self._candidates():
+            started = time.monotonic()
+            streaming = settled = False
+            try:
+                async for event in tier.model.stream_response(*args, **kwargs):
+                    streaming = True
+                    yield event
+            except Exception as e:
+                settled = True
+                # Once events have been sent on, switching models would garble the answer.
+                if streaming or not self._failed(tier, e):
+                    raise
+                last_error = e
+            else:
+                settled = True
+                self._served(tier, started)
+                return
+            finally:
+                if not settled:
+                    self._abandoned(tier)
+        raise last_error
+
+    def stats(self) -> list[dict]:
+        return [{
+            "tier": tier.name,
+            "state": tier.breaker.state,
+            "served": tier.served,
+            "failed": tier.failed,
+            "avg_latency_ms": round(tier.total_latency / tier.served * 1000, 1) if tier.served else None,
+        } for tier in self.tiers]
+
+
+def fallback_from_spec(spec: str, clients: dict[str, AsyncOpenAI]) -> FallbackModel:
+    """Build a FallbackModel from "provider:model,provider:model,...".
+
+    The provider part is optional and defaults to the first client given.
+    """
+    default = next(iter(clients))
+    entries = [entry.strip() for entry in spec.split(",") if entry.strip()]
+    tiers = []
+    for i, entry in enumerate(entries):
+        provider, _, name = entry.rpartition(":")
+        provider = provider or default
+        if provider not in clients:
+            raise ValueError(f"Unknown provider '{provider}' in model list. Known: {', '.join(clients)}")
+        client = clients[provider]
+        # Only the last tier keeps the client's own retries; the others fail over straight away.
+        if i < len(entries) - 1:
+            client = client.with_options(max_retries=0)
+        tiers.append(Tier(f"{provider}:{name}", OpenAIChatCompletionsModel(model=name, openai_client=client)))
+    return FallbackModel(tiers)
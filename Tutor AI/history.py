@@ -0,0 +1,269 @@
+# history.py
+import asyncio
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from agents import SessionABC, TResponseInputItem
+
+BLOCK = 64 * 1024
+
+
+class ChatLog:
+    """Append-only JSONL log of records (chat messages, session items, ...).
+
+    Each turn appends a line instead of rewriting the whole history. Writes are flushed right
+    away but fsync'd in batches: every `fsync_every` records, or `fsync_interval` seconds after
+    the first unsynced write (a timer covers idle periods), and at exit. A line left half-written
+    by a crash is cut off when the log is opened. Removing the last record appends a `pop` marker.
+    The file is compacted once markers pile up, or once it holds twice `max_entries` records;
+    compaction keeps at most the newest `max_entries` entries, starting at one for which
+    `boundary(entry)` is true, if given (so a conversation isn't cut mid-turn).
+    """
+
+    def __init__(self, path: str, fsync_every: int = 8, fsync_interval: float = 1.0, compact_after: int = 64,
+                 max_entries: int = 5000, boundary=None):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_after = compact_after
+        self.max_entries = max_entries
+        self.boundary = boundary
+        self.lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._timer: threading.Timer | None = None
+        self._pops = 0
+        self._count = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._recover_tail()
+        self._file = open(path, "a", encoding="utf-8")
+        for record in self._records():
+            self._count += 1
+            self._pops += record.get("op") == "pop"
+        if self._should_compact():
+            self.compact()
+        atexit.register(self.close)
+
+    def _recover_tail(self):
+        """Drop a trailing partial line left by a crash mid-write."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size == 0:
+            return
+        with open(self.path, "rb+") as f:
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Back to the last complete line, however many blocks the partial record spans.
+            end = size
+            while end > 0:
+                start = max(0, end - BLOCK)
+                f.seek(start)
+                cut = f.read(end - start).rfind(b"\n")
+                if cut != -1:
+                    f.truncate(start + cut + 1)
+                    return
+                end = start
+            f.truncate(0)
+
+    def _records(self):
+        """Every record in file order, skipping lines that don't parse."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except OSError:
+            return
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        self._count += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+        elif self._timer is None:
+            # No further write may come to trigger the sync, so one is scheduled.
+            self._timer = threading.Timer(self.fsync_interval, self._sync_later)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _sync_later(self):
+        with self.lock:
+            self._timer = None
+            self.sync()
+
+    def sync(self):
+        if self._unsynced and not self._file.closed:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def _should_compact(self) -> bool:
+        return self._pops >= self.compact_after or self._count >= 2 * self.max_entries
+
+    def append(self, *entries: dict):
+        with self.lock:
+            for entry in entries:
+                self._write({"op": "add", "data": entry})
+            if self._should_compact():
+                self._compact()
+
+    def pop(self) -> dict | None:
+        """Remove and return the last entry."""
+        with self.lock:
+            last = self.tail(1)
+            if not last:
+                return None
+            self._write({"op": "pop"})
+            self._pops += 1
+            if self._should_compact():
+                self._compact()
+            return last[0]
+
+    def entries(self) -> list[dict]:
+        live = []
+        for record in self._records():
+            if record.get("op") == "pop":
+                if live:
+                    live.pop()
+            elif "data" in record:
+                live.append(record["data"])
+        return live
+
+    def tail(self, n: int, keep=None) -> list[dict]:
+        """The last `n` entries (those for which `keep(entry)` is true, if given), oldest first.
+
+        Reads the file backwards block by block, so the cost depends on `n`, not the history length.
+        """
+        found = []
+        if n <= 0:
+            return found
+        for entry in self._reversed_records():
+            if keep is None or keep(entry):
+                found.append(entry)
+                if len(found) >= n:
+                    break
+        return found[::-1]
+
+    def _reversed_records(self):
+        """Live entries from newest to oldest, reading the file backwards."""
+        skip, carry = 0, b""
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            return
+        with f:
+            position = f.seek(0, os.SEEK_END)
+            while position > 0:
+                step = min(BLOCK, position)
+                position -= step
+                f.seek(position)
+                lines = (f.read(step) + carry).split(b"\n")
+                # The first piece may be the end of a line that starts in an earlier block.
+                carry = lines.pop(0) if position > 0 else b""
+                for line in reversed(lines):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("op") == "pop":
+                        skip += 1
+                    elif "data" in record:
+                        if skip:
+                            skip -= 1
+                        else:
+                            yield record["data"]
+
+    def clear(self):
+        with self.lock:
+            self._file.truncate(0)
+            self._file.seek(0)
+            os.fsync(self._file.fileno())
+            self._pops = 0
+            self._count = 0
+            self._unsynced = 0
+
+    def compact(self):
+        with self.lock:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the file with only the newest `max_entries` live entries, atomically."""
+        live = self.entries()
+        if len(live) > self.max_entries:
+            start = len(live) - self.max_entries
+            if self.boundary is not None:
+                start = next((i for i in range(start, len(live)) if self.boundary(live[i])), len(live))
+            live = live[start:]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for entry in live:
+                f.write(json.dumps({"op": "add", "data": entry}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._pops = 0
+        self._count = len(live)
+        self._unsynced = 0
+
+    def close(self):
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._file.closed:
+                self.sync()
+                self._file.close()
+
+
+def display_message(item: TResponseInputItem) -> dict | None:
+    """The chat bubble for a session item, or None for items the chat doesn't show (tool calls, ...)."""
+    role = item.get("role")
+    if role not in ("user", "assistant") or item.get("type", "message") != "message":
+        return None
+    content = item.get("content")
+    if not isinstance(content, str):
+        content = "".join(part.get("text", "") for part in content or []
+                          if part.get("type") in ("input_text", "output_text"))
+    return {"role": role, "content": content} if content else None
+
+
+class LogSession(SessionABC):
+    """Agent session stored in a ChatLog; the chat display is read from the same log."""
+
+    def __init__(self, session_id: str, path: str | None = None):
+        self.session_id = session_id
+        # Older turns are dropped whole: the retained history always starts at a user message.
+        self.log = ChatLog(path or f"{session_id}.jsonl", boundary=lambda item: item.get("role") == "user")
+
+    async def get_items(self, limit: int | None = None) -> list[TResponseInputItem]:
+        if limit is None:
+            return await asyncio.to_thread(self.log.entries)
+        return await asyncio.to_thread(self.log.tail, limit)
+
+    async def add_items(self, items: list[TResponseInputItem]) -> None:
+        if items:
+            await asyncio.to_thread(self.log.append, *items)
+
+    async def pop_item(self) -> TResponseInputItem | None:
+        return await asyncio.to_thread(self.log.pop)
+
+    async def clear_session(self) -> None:
+        await asyncio.to_thread(self.log.clear)
+
+    def messages(self, limit: int) -> list[dict]:
+        """The last `limit` chat messages, skipping tool calls and outputs without reading the whole log."""
+        items = self.log.tail(limit, keep=lambda item: display_message(item) is not None)
+        return [display_message(item) for item in items]
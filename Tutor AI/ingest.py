@@ -0,0 +1,259 @@
+# ingest.py
+import codecs
+import json
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from openai import AsyncOpenAI, OpenAI
+from reader import UploadFiles
+from retrieval import UploadIndexes
+
+WORKERS = int(os.getenv("TUTOR_INGEST_WORKERS", "2"))
+# A small, cheap model: the summary only orients the tutor, it isn't shown as an answer.
+SUMMARY_MODEL = os.getenv("TUTOR_SUMMARY_MODEL", "gemini:gemini-2.0-flash-lite")
+SUMMARY_INPUT_CHARS = 6000
+SUMMARY_TIMEOUT = 30.0
+# Statistical detection is unreliable on a few hundred bytes; short non-UTF-8 files are taken as Windows-1252.
+MIN_DETECT_BYTES = 4096
+
+_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+def detect_encoding(raw: bytes) -> str:
+    for bom, name in _BOMS:
+        if raw.startswith(bom):
+            return name
+    try:
+        raw.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    if len(raw) >= MIN_DETECT_BYTES:
+        try:
+            from charset_normalizer import from_bytes
+            best = from_bytes(raw).best()
+            if best is not None:
+                return best.encoding
+        except ImportError:
+            pass
+    try:
+        raw.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def normalize(text: str) -> str:
+    """One newline style, NFC Unicode, no NUL bytes."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "")
+    return unicodedata.normalize("NFC", text)
+
+
+@dataclass
+class FileStatus:
+    filename: str
+    state: str = "queued"  # queued, processing, summarizing, ready, failed or superseded
+    encoding: str | None = None
+    summary: str | None = None
+    error: str | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    source: dict | None = None
+
+
+class Ingestion:
+    """Prepares uploads in a worker pool, off the Streamlit thread.
+
+    Each upload is decoded (encoding detected) and rewritten as normalized UTF-8, chunked and
+    indexed for search, given its line offsets and outline for ranged reads, and summarized by a
+    cheap model. Status is tracked per file; tools can wait for a file until it is indexed (the
+    summary may still be running).
+
+    Jobs for the same file run one after another. Uploading a file again supersedes its pending
+    job: that job stops before publishing anything, and the newer one does the work. Status is
+    saved to disk at every step, so a process that dies mid-ingest leaves the file queued again
+    when it restarts.
+    """
+
+    def __init__(self, uploads_dir: str, indexes: UploadIndexes, files: UploadFiles,
+                 clients: dict[str, AsyncOpenAI], workers: int = WORKERS):
+        self.uploads_dir = uploads_dir
+        self.indexes = indexes
+        self.files = files
+        self.status_dir = os.path.join(uploads_dir, ".index")
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self.lock = threading.Lock()
+        self._status: dict[str, FileStatus] = {}
+        self._indexed: dict[str, threading.Event] = {}
+        self._jobs: dict[str, threading.Lock] = {}
+        provider, _, self.summary_model = SUMMARY_MODEL.partition(":")
+        client = clients.get(provider)
+        # Workers are plain threads, so they get a synchronous client with the same credentials.
+        self.summary_client = OpenAI(api_key=client.api_key, base_url=client.base_url,
+                                     timeout=SUMMARY_TIMEOUT) if client else None
+
+    def save(self, filename: str, data: bytes) -> Future:
+        """Store a (re-)uploaded file and queue it for ingestion."""
+        os.makedirs(self.uploads_dir, exist_ok=True)
+        # Written beside and swapped in, so a re-upload never truncates a file that is memory-mapped.
+        tmp = self._write_beside(filename, lambda f: f.write(data), "wb")
+        with self.lock:
+            # Swapped in and queued together, so a running job sees either the old file or its successor.
+            os.replace(tmp, os.path.join(self.uploads_dir, filename))
+            return self._submit(filename)
+
+    def submit(self, filename: str) -> Future:
+        with self.lock:
+            return self._submit(filename)
+
+    def _submit(self, filename: str) -> Future:
+        status = self._status[filename] = FileStatus(filename)
+        indexed = self._indexed[filename] = threading.Event()
+        self._save_status(status)
+        return self.pool.submit(self._ingest, status, indexed)
+
+    def status(self, filename: str) -> FileStatus | None:
+        with self.lock:
+            status = self._status.get(filename)
+        if status is None:
+            status = self._load_status(filename)
+        return status
+
+    def statuses(self) -> list[FileStatus]:
+        if not os.path.isdir(self.uploads_dir):
+            return []
+        names = sorted(n for n in os.listdir(self.uploads_dir)
+                       if os.path.isfile(os.path.join(self.uploads_dir, n)) and not n.endswith(".part"))
+        return [self.status(n) or FileStatus(n, state="not ingested") for n in names]
+
+    def wait(self, filename: str, timeout: float | None = None) -> FileStatus | None:
+        """Block until the file is indexed (or has failed), if it is being ingested."""
+        with self.lock:
+            indexed = self._indexed.get(filename)
+        if indexed is not None:
+            indexed.wait(timeout)
+        return self.status(filename)
+
+    def _status_path(self, filename: str) -> str:
+        return os.path.join(self.status_dir, filename + ".ingest.json")
+
+    def _save_status(self, status: FileStatus):
+        os.makedirs(self.status_dir, exist_ok=True)
+        tmp = self._status_path(status.filename) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(status), f, ensure_ascii=False)
+        os.replace(tmp, self._status_path(status.filename))
+
+    def _load_status(self, filename: str) -> FileStatus | None:
+        try:
+            with open(self._status_path(filename), "r", encoding="utf-8") as f:
+                status = FileStatus(**json.load(f))
+            stat = os.stat(os.path.join(self.uploads_dir, filename))
+        except (OSError, ValueError, TypeError):
+            return None
+        if status.state not in ("ready", "failed"):
+            # Left unfinished by a process that stopped mid-ingest: start over.
+            self.submit(filename)
+            return self.status(filename)
+        # Replaced since it was ingested (e.g. copied in by hand): the saved status no longer applies.
+        if status.source != {"size": stat.st_size, "mtime": stat.st_mtime}:
+            return None
+        with self.lock:
+            self._status.setdefault(filename, status)
+        return status
+
+    def _write_beside(self, filename: str, write, mode: str) -> str:
+        """Write a temporary file next to the upload and return its path."""
+        fd, tmp = tempfile.mkstemp(dir=self.uploads_dir, prefix=filename + ".", suffix=".part")
+        with os.fdopen(fd, mode, **({} if "b" in mode else {"encoding": "utf-8", "newline": ""})) as f:
+            write(f)
+        return tmp
+
+    def _superseded(self, status: FileStatus) -> bool:
+        with self.lock:
+            return self._status.get(status.filename) is not status
+
+    def _publish(self, status: FileStatus):
+        """Save the status, unless a newer upload of the file has taken over."""
+        if not self._superseded(status):
+            self._save_status(status)
+
+    def _step(self, status: FileStatus, name: str, fn):
+        start = time.monotonic()
+        result = fn()
+        status.timings[name] = round(time.monotonic() - start, 3)
+        return result
+
+    def _ingest(self, status: FileStatus, indexed: threading.Event):
+        with self.lock:
+            job = self._jobs.setdefault(status.filename, threading.Lock())
+        try:
+            with job:
+                if self._superseded(status):
+                    status.state = "superseded"
+                    return
+                self._run(status, indexed)
+        finally:
+            indexed.set()
+
+    def _run(self, status: FileStatus, indexed: threading.Event):
+        filename = status.filename
+        status.state = "processing"
+        self._publish(status)
+        path = os.path.join(self.uploads_dir, filename)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            status.encoding = self._step(status, "encoding", lambda: detect_encoding(raw))
+            text = self._step(status, "normalize", lambda: normalize(raw.decode(status.encoding, errors="replace")))
+            if self._superseded(status):
+                status.state = "superseded"
+                return
+            if text.encode("utf-8") != raw:
+                # Stored as UTF-8 so byte ranges and line offsets match what the tools decode.
+                tmp = self._write_beside(filename, lambda f: f.write(text), "w")
+                with self.lock:
+                    superseded = self._status.get(filename) is not status
+                    if not superseded:
+                        os.replace(tmp, path)
+                if superseded:
+                    # A newer upload replaced the file after it was read; its own job takes over.
+                    os.remove(tmp)
+                    status.state = "superseded"
+                    return
+            self._step(status, "index", lambda: self.indexes.build(filename, text))
+            mapped = self._step(status, "outline", lambda: self.files.build(filename))
+            stat = os.stat(path)
+            status.source = {"size": stat.st_size, "mtime": stat.st_mtime}
+            status.state = "summarizing"
+            self._publish(status)
+            indexed.set()
+            if self.summary_client:
+                try:
+                    status.summary = self._step(status, "summary", lambda: self._summarize(text, mapped.outline))
+                except Exception as e:
+                    # The file is still usable without a summary.
+                    status.error = f"summary: {type(e).__name__}: {e}"
+            status.state = "ready"
+        except Exception as e:
+            status.state = "failed"
+            status.error = f"{type(e).__name__}: {e}"
+        self._publish(status)
+
+    def _summarize(self, text: str, outline: dict) -> str:
+        response = self.summary_client.chat.completions.create(
+            model=self.summary_model,
+            messages=[{"role": "user", "content": (
+                "Summarize this uploaded study file in 2-4 sentences: what it is, what it covers, and how it "
+                f"is organized.\n\nOutline: {json.dumps(outline, ensure_ascii=False)[:1500]}\n\n"
+                f"Beginning of the file:\n{text[:SUMMARY_INPUT_CHARS]}"
+            )}],
+            max_tokens=200,
+        )
+        return (response.choices[0].message.content or "").strip()
@@ -1,9 +1,14 @@
+import json
 import os
 from dotenv import load_dotenv
-from agents import Agent, Runner, AsyncOpenAI, OpenAIChatCompletionsModel, SQLiteSession, function_tool
+from agents import Agent, Runner, AsyncOpenAI, function_tool
 from agents.run import RunConfig
-from duckduckgo_search import DDGS
-import requests
+from fallback import fallback_from_spec
+from history import LogSession
+from ingest import Ingestion
+from reader import UploadFiles
+from retrieval import UploadIndexes
+from search import searcher
 
 # Load the environment variables from the .env file
 load_dotenv()
@@ -20,9 +25,13 @@ external_client = AsyncOpenAI(
     base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
 )
 
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.5-flash",
-    openai_client=external_client,
+# Models tried in order when one is rate limited or failing, as "provider:model,...".
+clients = {"gemini": external_client}
+if openai_api_key := os.getenv("OPENAI_API_KEY"):
+    clients["openai"] = AsyncOpenAI(api_key=openai_api_key)
+model = fallback_from_spec(
+    os.getenv("TUTOR_MODELS", "gemini:gemini-2.5-flash,gemini:gemini-2.0-flash,gemini:gemini-1.5-flash"),
+    clients,
 )
 
 config = RunConfig(
@@ -32,6 +41,25 @@ config = RunConfig(
 )
 
 UPLOADS_DIR = "uploads"
+# Uploads longer than this are not returned whole; the model is pointed to search_uploaded_file.
+MAX_READ_CHARS = int(os.getenv("TUTOR_MAX_READ_CHARS", "20000"))
+upload_indexes = UploadIndexes(UPLOADS_DIR)
+upload_files = UploadFiles(UPLOADS_DIR)
+# Uploads are prepared in the background as soon as they arrive (see ingest.py).
+ingestion = Ingestion(UPLOADS_DIR, upload_indexes, upload_files, clients)
+# How long a tool waits for an upload that is still being ingested before answering "still processing".
+INGEST_WAIT = float(os.getenv("TUTOR_INGEST_WAIT", "5"))
+
+def find_upload(filename: str) -> tuple[str, str | None]:
+    """The upload's bare file name, and an error message if it can't be used yet."""
+    filename = os.path.basename(filename)
+    if not os.path.exists(os.path.join(UPLOADS_DIR, filename)):
+        return filename, f"Error: File '{filename}' not found in uploads."
+    status = ingestion.wait(filename, INGEST_WAIT)
+    if status is not None and status.state in ["queued", "processing"]:
+        return filename, (f"'{filename}' is still being processed ({status.state}). Tell the student it will "
+                          "be ready in a moment, then try again.")
+    return filename, None
 
 @function_tool()
 def create_quiz(topic: str, num_questions: int = 5, question_type: str = "multiple_choice") -> str:
@@ -98,21 +126,98 @@ def read_uploaded_file(filename: str) -> str:
     if not os.path.exists(UPLOADS_DIR):
         return "Error: Uploads directory not found."
 
+    # A file still being ingested may not be UTF-8 yet.
+    filename, error = find_upload(filename)
+    if error:
+        return error
     file_path = os.path.join(UPLOADS_DIR, filename)
 
-    if not os.path.exists(file_path):
-        return f"Error: File '{filename}' not found in uploads."
-
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+            content = f.read(MAX_READ_CHARS + 1)
+        if len(content) > MAX_READ_CHARS:
+            return (content[:MAX_READ_CHARS] + f"\n\n[Truncated: '{filename}' is longer than {MAX_READ_CHARS} "
+                    "characters. Use `search_uploaded_file` to find the relevant passages.]")
         return content
     except Exception as e:
         return f"Error reading file: {e}"
 
-agent = Agent(
-        name="Study Mode Tutor",
-        instructions='''
+@function_tool()
+def search_uploaded_file(filename: str, query: str, k: int = 5) -> str:
+    """
+    Search an uploaded file and return the k passages most relevant to the query.
+    Prefer this over read_uploaded_file for questions about large files.
+    """
+    filename, error = find_upload(filename)
+    if error:
+        return error
+    try:
+        results = upload_indexes.get(filename).search(query, max(1, min(k, 20)))
+    except Exception as e:
+        return f"Error searching file: {e}"
+    if not results:
+        return f"No passages in '{filename}' match '{query}'."
+    return "\n\n".join(f"[{filename}, lines {chunk['start'] + 1}-{chunk['end']}]\n{chunk['text']}"
+                       for _, chunk in results)
+
+@function_tool()
+def read_file_range(filename: str, start: int, end: int, unit: str = "lines") -> str:
+    """
+    Read one part of an uploaded file without loading the rest.
+    unit: "lines" returns lines start to end-1 (the first line is 1); "bytes" returns bytes start to end-1 (the first byte is 0).
+    """
+    filename, error = find_upload(filename)
+    if error:
+        return error
+    if unit not in ["lines", "bytes"]:
+        return "Error: unit must be 'lines' or 'bytes'"
+    try:
+        mapped = upload_files.get(filename)
+        if unit == "lines":
+            text = mapped.lines(start - 1, end - 1)
+            label = f"lines {start}-{min(end - 1, mapped.line_count)} of {mapped.line_count}"
+        else:
+            text = mapped.bytes(start, end)
+            label = f"bytes {start}-{min(end, mapped.source['size'])} of {mapped.source['size']}"
+    except Exception as e:
+        return f"Error reading file: {e}"
+    if len(text) > MAX_READ_CHARS:
+        text = text[:MAX_READ_CHARS] + "\n[Truncated: ask for a smaller range.]"
+    return f"[{filename}, {label}]\n{text}"
+
+@function_tool()
+def file_outline(filename: str) -> str:
+    """
+    Overview of an uploaded file: a short summary, size, line count, and its headings, CSV header and row count, or definitions.
+    Use it to decide which part of a large file to read.
+    """
+    filename, error = find_upload(filename)
+    if error:
+        return error
+    try:
+        outline = dict(upload_files.get(filename).outline)
+        status = ingestion.status(filename)
+        if status and status.summary:
+            outline["summary"] = status.summary
+        return json.dumps(outline, ensure_ascii=False)
+    except Exception as e:
+        return f"Error reading file: {e}"
+
+@function_tool()
+async def web_search(query: str, num_results: int = 5) -> str:
+    """
+    Search the web for recent or unfamiliar topics.
+    Returns the top results with their title, link and page text.
+    """
+    try:
+        pages = await searcher.search(query, max(1, min(num_results, 8)))
+    except Exception as e:
+        return f"Error: web search failed: {e}"
+    if not pages:
+        return f"No results found for '{query}'."
+    return "\n\n".join(f"[{i}] {p['title']}\n{p['url']}\n{p['text']}" for i, p in enumerate(pages, 1))
+
+INSTRUCTIONS = '''
 You are **Study Mode**, a world-class tutor like ChatGPT in Study Mode.
 
 Your job:
@@ -120,6 +225,8 @@ Your job:
 - Use tools when the user asks to **create quizzes, explain concepts, make flashcards, or generate practice problems**.
 - You can also **search the web** for topics you don't know about to provide the most up-to-date information.
 - You can **read files** that the user has uploaded. Use the `read_uploaded_file` tool for this.
+- For questions about a large uploaded file, use `search_uploaded_file` to get just the relevant passages.
+- To read a specific part of a large file, call `file_outline` first, then `read_file_range` for the lines you need.
 - Always be encouraging, structured, and interactive.
 - If the user says "quiz me on X", call `create_quiz`.
 - If they say "explain Y simply", call `explain_concept`.
@@ -133,13 +240,28 @@ Examples:
   • "Give me 3 hard calculus problems" → call `generate_practice_problems`
   • "What are the latest advancements in AI?" → call `web_search`
   • "Summarize the document 'my_doc.txt' that I uploaded." → call `read_uploaded_file(filename='my_doc.txt')`
-''',
+  • "What does 'notes.md' say about mitosis?" → call `search_uploaded_file(filename='notes.md', query='mitosis')`
+  • "Show me the 'Results' section of 'paper.md'" → call `file_outline`, then `read_file_range(filename='paper.md', start=120, end=180)`
+'''
+
+def tutor_instructions(run_context, agent) -> str:
+    """The instructions, plus the uploaded files and their precomputed summaries."""
+    files = [status for status in ingestion.statuses() if status.state in ["summarizing", "ready"]]
+    if not files:
+        return INSTRUCTIONS
+    listing = "\n".join(f"- {status.filename}: {status.summary or 'summary not available'}" for status in files)
+    return f"{INSTRUCTIONS}\nUploaded files:\n{listing}\n"
+
+agent = Agent(
+        name="Study Mode Tutor",
+        instructions=tutor_instructions,
         model=model,
-        tools=[create_quiz, explain_concept, create_flashcards, generate_practice_problems, read_uploaded_file]
+        tools=[create_quiz, explain_concept, create_flashcards, generate_practice_problems, read_uploaded_file,
+               search_uploaded_file, read_file_range, file_outline, web_search]
     )
 
-    # Optional: keep conversation history
-session = SQLiteSession("study_session_123")
+# Conversation history, kept on disk in study_session_123.jsonl; the UI shows it from the same file
+session = LogSession("study_session_123")
 
 def main():
     print("Study Mode Active! Ask anything (type 'quit' to exit)\n")
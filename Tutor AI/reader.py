@@ -0,0 +1,165 @@
+# reader.py
+import csv
+import io
+import json
+import mmap
+import os
+import re
+import threading
+import numpy as np
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_PY_DEF = re.compile(r"^(?:async\s+def|def|class)\s+\w+")
+MAX_OUTLINE_ENTRIES = 200
+# JSON has no streaming parser in the standard library; larger files get no key list.
+MAX_JSON_BYTES = 16 * 1024 * 1024
+
+
+def line_offsets(data) -> np.ndarray:
+    """Byte offset of the start of every line, plus the file length at the end."""
+    buffer = np.frombuffer(data, dtype=np.uint8) if len(data) else np.zeros(0, dtype=np.uint8)
+    starts = np.flatnonzero(buffer == ord("\n")) + 1
+    offsets = np.concatenate(([0], starts)).astype(np.int64)
+    if offsets[-1] != len(data):
+        offsets = np.append(offsets, len(data))
+    return offsets
+
+
+def iter_lines(data):
+    """Decoded lines of a mapped file (newline included), one at a time."""
+    position = 0
+    while position < len(data):
+        end = data.find(b"\n", position)
+        end = len(data) if end == -1 else end + 1
+        yield data[position:end].decode("utf-8", errors="replace")
+        position = end
+
+
+def build_outline(filename: str, data, offsets: np.ndarray) -> dict:
+    """Size, line count and a file-type specific outline (headings, CSV header and rows, definitions).
+
+    Text files are scanned line by line, so the file is never decoded as a whole.
+    """
+    outline = {"file": filename, "bytes": len(data), "lines": len(offsets) - 1}
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        reader = csv.reader(iter_lines(data))
+        header = next(reader, [])
+        outline["header"] = header
+        outline["rows"] = sum(1 for _ in reader)
+    elif extension in (".md", ".txt", ".py"):
+        entries, fenced = [], False
+        for number, line in enumerate(iter_lines(data), 1):
+            line = line.rstrip("\n")
+            if extension == ".py":
+                if _PY_DEF.match(line):
+                    entries.append({"line": number, "text": line.rstrip(":").strip()})
+                continue
+            if line.lstrip().startswith("```"):
+                fenced = not fenced
+            elif not fenced and (m := _HEADING.match(line)):
+                entries.append({"line": number, "level": len(m.group(1)), "text": m.group(2)})
+        outline["headings" if extension != ".py" else "definitions"] = entries[:MAX_OUTLINE_ENTRIES]
+        if len(entries) > MAX_OUTLINE_ENTRIES:
+            outline["truncated"] = len(entries) - MAX_OUTLINE_ENTRIES
+    elif extension == ".json":
+        if len(data) > MAX_JSON_BYTES:
+            outline["json"] = "too large to outline"
+            return outline
+        try:
+            value = json.loads(bytes(data))
+            outline["json"] = type(value).__name__
+            if isinstance(value, dict):
+                outline["keys"] = list(value)[:MAX_OUTLINE_ENTRIES]
+            elif isinstance(value, list):
+                outline["items"] = len(value)
+        except ValueError:
+            outline["json"] = "invalid"
+    return outline
+
+
+class MappedFile:
+    """An upload's line offsets and outline, for reading line or byte ranges without loading the file.
+
+    The file is mapped only for the duration of each read: keeping it open would hold a
+    descriptor per upload for the whole session, and on Windows a mapped file can't be replaced
+    by a re-upload.
+    """
+
+    def __init__(self, path: str, offsets: np.ndarray, outline: dict, source: dict):
+        self.path = path
+        self.offsets = offsets
+        self.outline = outline
+        self.source = source
+
+    @property
+    def line_count(self) -> int:
+        return len(self.offsets) - 1
+
+    def lines(self, start: int, end: int) -> str:
+        """Lines [start, end), 0-based."""
+        start, end = max(0, start), min(end, self.line_count)
+        if start >= end:
+            return ""
+        return self.bytes(int(self.offsets[start]), int(self.offsets[end]))
+
+    def bytes(self, start: int, end: int) -> str:
+        start, end = max(0, start), min(end, self.source["size"])
+        if start >= end:
+            return ""
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return data[start:end].decode("utf-8", errors="replace")
+
+
+class UploadFiles:
+    """Line-offset index and outline for each upload, computed once and kept in `<uploads>/.index/`."""
+
+    def __init__(self, uploads_dir: str):
+        self.uploads_dir = uploads_dir
+        self.index_dir = os.path.join(uploads_dir, ".index")
+        self.lock = threading.Lock()
+        self._open: dict[str, MappedFile] = {}
+
+    def _source(self, filename: str) -> dict:
+        stat = os.stat(os.path.join(self.uploads_dir, filename))
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def build(self, filename: str) -> MappedFile:
+        path = os.path.join(self.uploads_dir, filename)
+        source = self._source(filename)
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if source["size"] else b""
+            try:
+                offsets = line_offsets(data)
+                outline = build_outline(filename, data, offsets)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+        os.makedirs(self.index_dir, exist_ok=True)
+        base = os.path.join(self.index_dir, filename)
+        np.save(base + ".lines.npy", offsets)
+        with open(base + ".outline.json", "w", encoding="utf-8") as f:
+            json.dump({"source": source, "outline": outline}, f, ensure_ascii=False)
+        return self._keep(filename, MappedFile(path, offsets, outline, source))
+
+    def _keep(self, filename: str, mapped: MappedFile) -> MappedFile:
+        with self.lock:
+            self._open[filename] = mapped
+        return mapped
+
+    def get(self, filename: str) -> MappedFile:
+        source = self._source(filename)
+        with self.lock:
+            mapped = self._open.get(filename)
+        if mapped is not None and mapped.source == source:
+            return mapped
+        base = os.path.join(self.index_dir, filename)
+        try:
+            with open(base + ".outline.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["source"] != source:
+                return self.build(filename)
+            offsets = np.load(base + ".lines.npy")
+        except (OSError, ValueError, KeyError):
+            return self.build(filename)
+        return self._keep(filename, MappedFile(os.path.join(self.uploads_dir, filename), offsets, meta["outline"], source))
@@ -0,0 +1,163 @@
+# retrieval.py
+import json
+import os
+import re
+import threading
+import numpy as np
+
+CHUNK_CHARS = int(os.getenv("TUTOR_CHUNK_CHARS", "1200"))
+# BM25 parameters (the usual defaults).
+K1 = 1.5
+B = 0.75
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def chunk_lines(lines: list[str], size: int = CHUNK_CHARS) -> list[dict]:
+    """Group lines into passages of about `size` characters, preferring to break at blank lines.
+
+    Each chunk keeps its line range [start, end) so an answer can point back into the file.
+    """
+    chunks, start, length = [], 0, 0
+    for i, line in enumerate(lines):
+        length += len(line)
+        at_break = not line.strip()
+        if length >= size or (at_break and length >= size // 2):
+            chunks.append({"start": start, "end": i + 1})
+            start, length = i + 1, 0
+    if start < len(lines):
+        chunks.append({"start": start, "end": len(lines)})
+    for chunk in chunks:
+        chunk["text"] = "".join(lines[chunk["start"]:chunk["end"]]).strip()
+    return [chunk for chunk in chunks if chunk["text"]]
+
+
+class ChunkIndex:
+    """BM25 over a file's chunks.
+
+    Postings are kept term-major in CSR form: the chunks containing term t are
+    `chunk_ids[indptr[t]:indptr[t + 1]]`, with their term counts in `counts`. A query only
+    touches the postings of its own terms.
+    """
+
+    def __init__(self, chunks: list[dict], vocab: dict[str, int], indptr: np.ndarray, chunk_ids: np.ndarray,
+                 counts: np.ndarray, lengths: np.ndarray, source: dict):
+        self.chunks = chunks
+        self.vocab = vocab
+        self.indptr = indptr
+        self.chunk_ids = chunk_ids
+        self.counts = counts
+        self.lengths = lengths
+        self.source = source
+        n = len(chunks)
+        df = np.diff(indptr).astype(np.float32)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.norm = (K1 * (1 - B + B * lengths / max(float(lengths.mean()) if n else 1.0, 1.0))).astype(np.float32)
+
+    @classmethod
+    def build(cls, text: str, source: dict) -> "ChunkIndex":
+        chunks = chunk_lines(text.splitlines(keepends=True))
+        vocab: dict[str, int] = {}
+        rows, cols, lengths = [], [], []
+        for c, chunk in enumerate(chunks):
+            tokens = tokenize(chunk["text"])
+            lengths.append(len(tokens))
+            for token in tokens:
+                rows.append(vocab.setdefault(token, len(vocab)))
+                cols.append(c)
+        terms = np.asarray(rows, dtype=np.int32)
+        docs = np.asarray(cols, dtype=np.int32)
+        # Sort (term, chunk) pairs and count duplicates to get per-term postings with counts.
+        order = np.lexsort((docs, terms))
+        terms, docs = terms[order], docs[order]
+        if len(terms):
+            new = np.ones(len(terms), dtype=bool)
+            new[1:] = (terms[1:] != terms[:-1]) | (docs[1:] != docs[:-1])
+            starts = np.flatnonzero(new)
+            counts = np.diff(np.append(starts, len(terms))).astype(np.float32)
+            terms, docs = terms[starts], docs[starts]
+        else:
+            counts = np.zeros(0, dtype=np.float32)
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(vocab)), out=indptr[1:])
+        return cls(chunks, vocab, indptr, docs, counts, np.asarray(lengths, dtype=np.float32), source)
+
+    def search(self, query: str, k: int = 5) -> list[tuple[float, dict]]:
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for token in set(tokenize(query)):
+            t = self.vocab.get(token)
+            if t is None:
+                continue
+            lo, hi = self.indptr[t], self.indptr[t + 1]
+            ids, tf = self.chunk_ids[lo:hi], self.counts[lo:hi]
+            scores[ids] += self.idf[t] * tf * (K1 + 1) / (tf + self.norm[ids])
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.chunks[i]) for i in top]
+
+    def save(self, base: str):
+        np.savez(base + ".npz", indptr=self.indptr, chunk_ids=self.chunk_ids, counts=self.counts, lengths=self.lengths)
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({"source": self.source, "vocab": self.vocab, "chunks": self.chunks}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, base: str) -> "ChunkIndex":
+        with open(base + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(base + ".npz") as arrays:
+            return cls(meta["chunks"], meta["vocab"], arrays["indptr"], arrays["chunk_ids"], arrays["counts"],
+                       arrays["lengths"], meta["source"])
+
+
+class UploadIndexes:
+    """Indexes for the files in an uploads directory, persisted in `<uploads>/.index/`.
+
+    An index is rebuilt when its file's size or modification time no longer matches.
+    """
+
+    def __init__(self, uploads_dir: str):
+        self.uploads_dir = uploads_dir
+        self.index_dir = os.path.join(uploads_dir, ".index")
+        self.lock = threading.Lock()
+        self._loaded: dict[str, ChunkIndex] = {}
+
+    def _source(self, filename: str) -> dict:
+        stat = os.stat(os.path.join(self.uploads_dir, filename))
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def build(self, filename: str, text: str | None = None) -> ChunkIndex:
+        path = os.path.join(self.uploads_dir, filename)
+        source = self._source(filename)
+        if text is None:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        index = ChunkIndex.build(text, source)
+        os.makedirs(self.index_dir, exist_ok=True)
+        index.save(os.path.join(self.index_dir, filename))
+        with self.lock:
+            self._loaded[filename] = index
+        return index
+
+    def get(self, filename: str) -> ChunkIndex:
+        source = self._source(filename)
+        with self.lock:
+            index = self._loaded.get(filename)
+        if index is not None and index.source == source:
+            return index
+        base = os.path.join(self.index_dir, filename)
+        try:
+            index = ChunkIndex.load(base)
+        except (OSError, ValueError, KeyError):
+            index = None
+        if index is None or index.source != source:
+            return self.build(filename)
+        with self.lock:
+            self._loaded[filename] = index
+        return index
@@ -0,0 +1,199 @@
+# search.py
+# Web search for the tutor, within a fixed latency budget. A fork of the chatbot's searcher
+# (chatbot/tools.py), cut down to what the tutor needs and reading the same fixture format; the
+# apps are separate projects and share no code. What differs: one budget covers the results and
+# every page fetch, at most PER_HOST pages are fetched from a host at a time, and the searcher
+# keeps its own event loop thread (each Streamlit turn runs in a fresh `asyncio.run`, and the
+# HTTP pool has to outlive it).
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Whole search, results and page fetches included; pages not back by then fall back to their snippet.
+BUDGET = float(os.getenv("TUTOR_SEARCH_BUDGET", "6"))
+RESULTS_TIMEOUT = 3.0
+FETCH_TIMEOUT = 4.0
+PER_HOST = 2
+MAX_PAGE_BYTES = 1_000_000
+PAGE_CHARS = 1500
+CACHE_TTL = float(os.getenv("TUTOR_SEARCH_CACHE_TTL", "900"))
+# Answers where a page fell back to its snippet are kept only briefly: the host may be back soon.
+DEGRADED_TTL = 30.0
+CACHE_SIZE = 256
+
+_SKIP = {"script", "style", "noscript", "svg", "head", "nav", "footer", "form"}
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        self.skipping += tag in _SKIP
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP and self.skipping:
+            self.skipping -= 1
+
+    def handle_data(self, data):
+        if not self.skipping and data.strip():
+            self.parts.append(data.strip())
+
+
+def extract_text(html: str, max_chars: int = PAGE_CHARS) -> str:
+    """Readable text of an HTML page, without scripts, styles and navigation."""
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    return " ".join(" ".join(parser.parts).split())[:max_chars]
+
+
+def duckduckgo_results(query: str, k: int) -> list[dict]:
+    from duckduckgo_search import DDGS
+    with DDGS() as ddgs:
+        hits = list(ddgs.text(query, max_results=k) or [])
+    return [{"title": h.get("title", ""), "url": h.get("href", ""), "snippet": h.get("body", "")} for h in hits]
+
+
+def fixture_results(path: str):
+    """Canned results from a JSON file: {"query": [{"title", "url", "snippet", "html"}]}.
+
+    A result's `html`, if present, is used instead of fetching its URL.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        results = {normalize_query(q): rs for q, rs in json.load(f).items()}
+
+    def lookup(query: str, k: int) -> list[dict]:
+        return results.get(normalize_query(query), [])[:k]
+    return lookup
+
+
+class WebSearch:
+    """Search results with the text of their pages, fetched concurrently within `budget` seconds.
+
+    `results(query, k)` is a synchronous search (run in a thread). HTML is reduced to text in a
+    thread pool. Answers are cached per query for CACHE_TTL, or DEGRADED_TTL when any page fell
+    back to its snippet.
+    """
+
+    def __init__(self, results=duckduckgo_results, budget: float = BUDGET, cache_ttl: float = CACHE_TTL):
+        self.results = results
+        self.budget = budget
+        self.cache_ttl = cache_ttl
+        self.cache: dict[tuple[str, int], tuple[float, list[dict]]] = {}
+        self.pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="extract")
+        self.client: httpx.AsyncClient | None = None
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+        self._host_users: dict[str, int] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="web-search", daemon=True).start()
+            return self._loop
+
+    async def search(self, query: str, k: int = 5) -> list[dict]:
+        """Callable from any event loop; the work itself runs on the search loop."""
+        future = asyncio.run_coroutine_threadsafe(self._search(query, k), self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+    async def _search(self, query: str, k: int) -> list[dict]:
+        key = (normalize_query(query), k)
+        cached = self.cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.budget
+        results = await asyncio.wait_for(asyncio.to_thread(self.results, query, k), min(RESULTS_TIMEOUT, self.budget))
+        tasks = [asyncio.create_task(self._page_text(r, deadline)) for r in results]
+        if tasks:
+            await asyncio.wait(tasks, timeout=max(0.0, deadline - loop.time()))
+        pages, complete = [], True
+        for result, task in zip(results, tasks):
+            text = task.result() if task.done() else ""
+            task.cancel()
+            complete = complete and bool(text)
+            pages.append({"title": result.get("title", ""), "url": result.get("url", ""),
+                          "text": text or result.get("snippet", "")})
+        if len(self.cache) >= CACHE_SIZE:
+            self.cache.pop(next(iter(self.cache)))
+        self.cache[key] = (time.monotonic() + (self.cache_ttl if complete else DEGRADED_TTL), pages)
+        return pages
+
+    async def _page_text(self, result: dict, deadline: float) -> str:
+        html = result.get("html")
+        if html is None:
+            html = await self._fetch(result.get("url", ""), deadline)
+        if not html:
+            return ""
+        return await asyncio.get_running_loop().run_in_executor(self.pool, extract_text, html)
+
+    async def _fetch(self, url: str, deadline: float) -> str:
+        host = urlsplit(url).netloc.lower()
+        if not host:
+            return ""
+        limit = self._hosts.setdefault(host, asyncio.Semaphore(PER_HOST))
+        self._host_users[host] = self._host_users.get(host, 0) + 1
+        try:
+            async with limit:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    return ""
+                return await self.get(url, min(FETCH_TIMEOUT, remaining))
+        except Exception:
+            # A slow or broken page shouldn't sink the whole search; its snippet is used instead.
+            return ""
+        finally:
+            self._host_users[host] -= 1
+            if not self._host_users[host]:
+                del self._host_users[host], self._hosts[host]
+
+    async def get(self, url: str, timeout: float) -> str:
+        """The page's HTML, at most MAX_PAGE_BYTES of it; empty if it isn't HTML."""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                follow_redirects=True,
+                headers={"User-Agent": "Mozilla/5.0 (compatible; StudyModeTutor/1.0)"},
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        async with self.client.stream("GET", url, timeout=timeout) as response:
+            response.raise_for_status()
+            if "html" not in response.headers.get("content-type", "html"):
+                return ""
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= MAX_PAGE_BYTES:
+                    break
+            return body.decode(response.encoding or "utf-8", errors="replace")
+
+
+def from_env() -> WebSearch:
+    """DuckDuckGo, or canned results when TUTOR_SEARCH_BACKEND is "fixture"."""
+    if os.getenv("TUTOR_SEARCH_BACKEND", "duckduckgo").lower() == "fixture":
+        return WebSearch(fixture_results(os.getenv("TUTOR_SEARCH_FIXTURE", os.path.join(HERE, "fixtures", "search.json"))))
+    return WebSearch()
+
+
+searcher = from_env()
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import time
+from search import HERE, WebSearch, extract_text, fixture_results
+
+FIXTURE = os.path.join(HERE, "fixtures", "search.json")
+
+
+def canned(*urls):
+    """A results function returning one result per URL, none of them carrying HTML."""
+    return lambda query, k: [{"title": url, "url": url, "snippet": f"snippet of {url}"} for url in urls][:k]
+
+
+def slow_pages(delays: dict[str, float]):
+    """A stand-in for WebSearch.get: each URL answers after its delay."""
+    async def get(url, timeout):
+        delay = delays[url]
+        await asyncio.sleep(min(delay, timeout))
+        if delay > timeout:
+            raise TimeoutError(url)
+        return f"<p>text of {url}</p>"
+    return get
+
+
+def test_fixture_results_are_served_without_fetching():
+    web = WebSearch(fixture_results(FIXTURE))
+    pages = asyncio.run(web.search("Photosynthesis?", 2))
+    assert [p["url"] for p in pages] == ["https://bio.example.org/photosynthesis",
+                                         "https://plants.example.com/light-reactions"]
+    assert pages[0]["text"].startswith("Photosynthesis Photosynthesis converts light energy")
+    assert "var x" not in pages[0]["text"]
+
+
+def test_slow_host_falls_back_to_its_snippet_within_the_budget():
+    web = WebSearch(canned("https://fast.test/a", "https://slow.test/b"), budget=0.5)
+    web.get = slow_pages({"https://fast.test/a": 0.05, "https://slow.test/b": 30})
+    started = time.monotonic()
+    pages = asyncio.run(web.search("q"))
+    assert time.monotonic() - started < 1.0
+    assert pages[0]["text"] == "text of https://fast.test/a"
+    assert pages[1]["text"] == "snippet of https://slow.test/b"
+
+
+def test_degraded_answers_are_cached_briefly():
+    web = WebSearch(canned("https://fast.test/a", "https://slow.test/b"), budget=0.3, cache_ttl=900)
+    web.get = slow_pages({"https://fast.test/a": 0.01, "https://slow.test/b": 30})
+    asyncio.run(web.search("q"))
+    (expires, _), = web.cache.values()
+    assert expires - time.monotonic() < 60
+
+
+def test_complete_answers_are_cached_for_the_ttl():
+    calls = []
+    results = canned("https://fast.test/a")
+    web = WebSearch(lambda q, k: calls.append(q) or results(q, k), cache_ttl=900)
+    web.get = slow_pages({"https://fast.test/a": 0.01})
+
+    async def twice():
+        return await web.search("Some query"), await web.search("some   query!")
+    first, second = asyncio.run(twice())
+    assert first is second and calls == ["Some query"]
+    (expires, _), = web.cache.values()
+    assert expires - time.monotonic() > 800
+
+
+def test_host_limits_are_dropped_once_idle():
+    web = WebSearch(canned("https://a.test/1", "https://a.test/2", "https://a.test/3", "https://b.test/1"))
+    web.get = slow_pages(dict.fromkeys(["https://a.test/1", "https://a.test/2", "https://a.test/3",
+                                        "https://b.test/1"], 0.01))
+    asyncio.run(web.search("q"))
+    assert web._hosts == {} and web._host_users == {}
+
+
+def test_extract_text_skips_scripts_and_navigation():
+    html = "<html><head><title>t</title></head><body><nav>menu</nav><script>x()</script><p>Body  text</p></body></html>"
+    assert extract_text(html) == "Body text"
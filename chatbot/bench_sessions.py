@@ -0,0 +1,76 @@
+"""Benchmark the cost of opening a chatbot connection.
+
+Compares the old ``start()`` behaviour, which built a client, model, run config
+and agent for every connecting user, with the shared per-process objects used
+now. No requests are sent to the model; only connection setup is measured.
+
+    python bench_sessions.py --connections 1000
+"""
+import argparse
+import time
+import tracemalloc
+from agents import Agent, AsyncOpenAI, OpenAIChatCompletionsModel
+from agents.run import RunConfig
+
+BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+
+
+def build_stack():
+    """Build the client/model/config/agent stack exactly as the chatbot does."""
+    client = AsyncOpenAI(api_key="bench-key", base_url=BASE_URL)
+    model = OpenAIChatCompletionsModel(model="gemini-2.0-flash", openai_client=client)
+    config = RunConfig(model=model, model_provider=client, tracing_disabled=True)
+    agent = Agent(name="Assistant", instructions="You are a helpful assistant", model=model)
+    return config, agent
+
+
+def open_connection_before(user_session: dict):
+    """The per-user setup `start()` used to do."""
+    config, agent = build_stack()
+    user_session["chat_history"] = []
+    user_session["config"] = config
+    user_session["agent"] = agent
+
+
+def open_connection_after(user_session: dict):
+    """The per-user setup `start()` does now: only the chat history."""
+    user_session["chat_history"] = []
+
+
+def run(label: str, open_connection, connections: int):
+    sessions = []
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    for _ in range(connections):
+        user_session = {}
+        open_connection(user_session)
+        sessions.append(user_session)
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_conn_us = elapsed / connections * 1e6
+    per_user_kb = (current - baseline) / connections / 1024
+    print(f"{label:<8} {per_conn_us:>12.1f} us/conn {per_user_kb:>12.2f} KiB/user "
+          f"{peak / 1024 / 1024:>10.1f} MiB peak")
+    return per_conn_us, per_user_kb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=1000)
+    args = parser.parse_args()
+
+    # The shared stack is built once per process, exactly like main.py does at import.
+    build_stack()
+
+    print(f"Simulating {args.connections} connections\n")
+    before = run("before", open_connection_before, args.connections)
+    after = run("after", open_connection_after, args.connections)
+    print(f"\nconnection-open speedup: {before[0] / max(after[0], 1e-9):.0f}x, "
+          f"memory saved per user: {before[1] - after[1]:.2f} KiB")
+
+
+if __name__ == "__main__":
+    main()
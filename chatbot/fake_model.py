@@ -0,0 +1,111 @@
+"""A local stand-in for an OpenAI-compatible chat completions endpoint.
+
+Used by the load test so no real model is called. It answers every request with
+a fixed number of tokens after a configurable delay, streamed or not, and can
+inject errors (e.g. 429s).
+
+    python fake_model.py --port 8765 --ttft 0.3 --token-delay 0.02 --tokens 40
+    GEMINI_BASE_URL=http://127.0.0.1:8765/ chainlit run main.py --headless
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+
+class FakeModelServer:
+    def __init__(self, ttft: float = 0.3, token_delay: float = 0.02, tokens: int = 40,
+                 error_rate: float = 0.0, error_status: int = 429):
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            headers = {k.strip().lower(): v.strip() for k, _, v in
+                       (line.partition(":") for line in header_lines if line)}
+            length = int(headers.get("content-length", 0))
+            body = json.loads(await reader.readexactly(length)) if length else {}
+            self.requests += 1
+
+            if not request_line.split(" ")[1].rstrip("/").endswith("/chat/completions"):
+                await self._send_json(writer, 404, {"error": {"message": "not found"}})
+            elif random.random() < self.error_rate:
+                await self._send_json(writer, self.error_status,
+                                      {"error": {"message": "injected error", "code": self.error_status}})
+            elif body.get("stream"):
+                await self._stream(writer, body)
+            else:
+                await asyncio.sleep(self.ttft + self.token_delay * self.tokens)
+                await self._send_json(writer, 200, self._completion(body))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _words(self) -> list[str]:
+        return [f"word{i} " for i in range(self.tokens)]
+
+    def _completion(self, body: dict) -> dict:
+        return {
+            "id": f"fake-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "".join(self._words())}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": self.tokens, "total_tokens": 10 + self.tokens},
+        }
+
+    async def _stream(self, writer: asyncio.StreamWriter, body: dict):
+        writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\nconnection: close\r\n\r\n")
+        await asyncio.sleep(self.ttft)
+        base = {"id": f"fake-{self.requests}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model", "fake")}
+        for word in self._words():
+            chunk = {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": word},
+                                          "finish_reason": None}]}
+            writer.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+            await asyncio.sleep(self.token_delay)
+        last = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": self.tokens, "total_tokens": 10 + self.tokens}}
+        writer.write(f"data: {json.dumps(last)}\n\ndata: [DONE]\n\n".encode())
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} X\r\ncontent-type: application/json\r\n"
+                     f"content-length: {len(data)}\r\nconnection: close\r\n\r\n".encode() + data)
+        await writer.drain()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible model stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between tokens")
+    parser.add_argument("--tokens", type=int, default=40, help="tokens per reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=429)
+    args = parser.parse_args()
+
+    server = FakeModelServer(args.ttft, args.token_delay, args.tokens, args.error_rate, args.error_status)
+    print(f"Fake model listening on http://{args.host}:{args.port}/")
+    asyncio.run(server.serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
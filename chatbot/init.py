@@ -1,13 +1,15 @@
 import os
+import logging
 from dotenv import load_dotenv
-from typing import cast
 import chainlit as cl
-from agents import Agent, Runner, AsyncOpenAI, OpenAIChatCompletionsModel
+from agents import Agent, AsyncOpenAI
 from agents.run import RunConfig
+from runs import RunTracker
+from fallback import fallback_from_spec, served_tiers
+from logs import Timer, log_event, sampled, setup_logging
 
-# Import the web_search function from your tools file
-# Make sure the web_search function (from the "Web Search Tool" Canvas)
-# is saved in a file named 'tools.py' in the same directory as this script.
+# Import the web_search tool from tools.py.
+# Set SEARCH_BACKEND=fixture to serve results from fixtures/search.json instead of DuckDuckGo.
 from tools import web_search
 
 # Load the environment variables from the .env file
@@ -18,81 +20,123 @@ gemini_api_key = os.getenv("GEMINI_API_KEY")
 # Check if the API key is present; if not, raise an error
 if not gemini_api_key:
     raise ValueError("GEMINI_API_KEY is not set. Please ensure it is defined in your .env file.")
+
+log = setup_logging("chatbot")
+
+# What a new message does to a run that is still going: "cancel" or "supersede".
+tracker = RunTracker(policy=os.getenv("CHAT_ON_NEW_MESSAGE", "cancel"))
     
 
+# The client, model, run config and agent are immutable and safe to share, so
+# they are built once per process instead of once per connecting user.
+#Reference: https://ai.google.dev/gemini-api/docs/openai
+# GEMINI_BASE_URL can point at a local stand-in such as fake_model.py for load tests.
+external_client = AsyncOpenAI(
+    api_key=gemini_api_key,
+    base_url=os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/"),
+)
+
+# Models tried in order when one is rate limited or failing, as "provider:model,...".
+clients = {"gemini": external_client}
+if openai_api_key := os.getenv("OPENAI_API_KEY"):
+    clients["openai"] = AsyncOpenAI(api_key=openai_api_key)
+model = fallback_from_spec(
+    os.getenv("CHAT_MODELS", "gemini:gemini-2.0-flash,gemini:gemini-2.5-flash,gemini:gemini-1.5-flash"),
+    clients,
+)
+
+config = RunConfig(
+    model=model,
+    model_provider=external_client,
+    tracing_disabled=True
+)
+
+# Initialize the Agent and pass the web_search function as a tool
+agent: Agent = Agent(
+    name="Assistant", 
+    instructions="You are a helpful assistant with access to web search. Use the web_search tool for any queries that require current information or external knowledge.",
+    model=model,
+    tools=[web_search] # <-- This is where you register the tool
+)
+
 @cl.on_chat_start
 async def start():
-    #Reference: https://ai.google.dev/gemini-api/docs/openai
-    external_client = AsyncOpenAI(
-        api_key=gemini_api_key,
-        base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-    )
-
-    model = OpenAIChatCompletionsModel(
-        model="gemini-2.0-flash",
-        openai_client=external_client
-    )
-
-    config = RunConfig(
-        model=model,
-        model_provider=external_client,
-        tracing_disabled=True
-    )
     """Set up the chat session when a user connects."""
-    # Initialize an empty chat history in the session.
+    # Only per-user state lives in the session.
     cl.user_session.set("chat_history", [])
 
-    cl.user_session.set("config", config)
-    
-    # Initialize the Agent and pass the web_search function as a tool
-    agent: Agent = Agent(
-        name="Assistant", 
-        instructions="You are a helpful assistant with access to web search. Use the web_search tool for any queries that require current information or external knowledge.",
-        model=model,
-        tools=[web_search] # <-- This is where you register the tool
-    )
- 
-    cl.user_session.set("agent", agent)
-
     await cl.Message(content="Hello! How can I help you today?").send()
 
 @cl.on_message
 async def main(message: cl.Message):
     """Process incoming messages and generate responses."""
+    session_id = cl.context.session.id
+
+    # A newer message stops whatever is still running for this user.
+    if stopped := tracker.cancel_session(session_id):
+        log_event(log, "run_cancelled", session=session_id, runs=stopped,
+                  tokens_saved_total=tracker.metrics.tokens_saved)
+
     # Send a thinking message
     msg = cl.Message(content="Thinking...")
     await msg.send()
 
-    agent: Agent = cast(Agent, cl.user_session.get("agent"))
-    config: RunConfig = cast(RunConfig, cl.user_session.get("config"))
-
     # Retrieve the chat history from the session.
     history = cl.user_session.get("chat_history") or []
-    
-    # Append the user's message to the history.
-    history.append({"role": "user", "content": message.content})
-    
+
+    # User messages whose runs have not finished yet. Under the "supersede" policy the
+    # questions of cancelled runs are answered together with the new one.
+    pending = (cl.user_session.get("pending_messages") or []) if tracker.policy == "supersede" else []
+    pending = pending + [{"role": "user", "content": message.content}]
+    cl.user_session.set("pending_messages", pending)
 
     try:
-        print("\n[CALLING_AGENT_WITH_CONTEXT]\n", history, "\n")
-        result = Runner.run_sync(starting_agent = agent,
-                                 input=history,
-                                 run_config=config)
-        
-        response_content = result.final_output
-        
+        timer = Timer()
+        # The fallback model records which tier served each model call of this turn.
+        tiers = []
+        served_tiers.set(tiers)
+        # Only sizes are logged per turn; the full context is kept for a sampled few.
+        log_event(log, "agent_call", session=session_id, history_items=len(history),
+                  pending_items=len(pending), history=sampled(history))
+        run = tracker.start(session_id, agent, history + pending, config)
+
+        started = False
+        async for delta in tracker.text_deltas(run):
+            if not started:
+                msg.content = ""
+                started = True
+            await msg.stream_token(delta)
+
+        if run.cancelled:
+            msg.content = (msg.content if started else "") + "\n\n*(Stopped.)*"
+            await msg.update()
+            return
+
+        response_content = run.result.final_output
+
+        # Update the session with the new history.
+        cl.user_session.set("chat_history", run.result.to_input_list())
+        cl.user_session.set("pending_messages", [])
+
         # Update the thinking message with the actual response
         msg.content = response_content
         await msg.update()
-    
-        # Update the session with the new history.
-        cl.user_session.set("chat_history", result.to_input_list())
-        
+
         # Optional: Log the interaction
-        print(f"User: {message.content}")
-        print(f"Assistant: {response_content}")
-        
+        log_event(log, "turn_complete", session=session_id, ms=timer.ms(), tiers=tiers,
+                  user=message.content, assistant=response_content)
+
     except Exception as e:
         msg.content = f"Error: {str(e)}"
         await msg.update()
-        print(f"Error: {str(e)}")
+        log_event(log, "turn_failed", logging.ERROR, session=session_id, error=str(e))
+
+@cl.on_stop
+async def stop():
+    """Stop the running answer when the user presses the stop button."""
+    tracker.cancel_session(cl.context.session.id)
+
+@cl.on_chat_end
+async def end():
+    """Cancel everything still running when the user disconnects."""
+    tracker.cancel_session(cl.context.session.id)
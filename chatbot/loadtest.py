@@ -0,0 +1,348 @@
+"""Websocket load test for the Chainlit chatbot.
+
+Opens N Chainlit sessions over Socket.IO, replays scripted multi-turn
+conversations and reports turn latency percentiles, error rates, the server's
+event-loop lag and memory per session.
+
+Event-loop lag is probed from outside: a cheap HTTP endpoint is polled while the
+sessions run. A handler that blocks the loop (e.g. Runner.run_sync) makes every
+probe wait, so it shows up directly in the lag numbers.
+
+    # Start everything locally against the fake model and run 200 sessions:
+    python loadtest.py --spawn --sessions 200
+
+    # Or point it at a running server:
+    python loadtest.py --url http://localhost:8000 --sessions 200 --server-pid 1234
+
+Needs the `loadtest` extra: `uv sync --extra loadtest`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import httpx
+import socketio
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SCRIPT = [
+    ["Hi there!", "Can you explain what an event loop is?", "Give me a short example.", "Thanks!"],
+    ["What is the capital of France?", "And its population?", "Summarize that in one line."],
+]
+
+
+@dataclass
+class Report:
+    turn_latencies: list[float] = field(default_factory=list)
+    first_token_latencies: list[float] = field(default_factory=list)
+    connect_latencies: list[float] = field(default_factory=list)
+    probe_latencies: list[float] = field(default_factory=list)
+    client_lag: list[float] = field(default_factory=list)
+    turns: int = 0
+    errors: dict[str, int] = field(default_factory=dict)
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def rss_kib(pid: int) -> int | None:
+    """Resident memory of a process in KiB (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+class ChatSession:
+    """One simulated browser tab speaking Chainlit's Socket.IO protocol."""
+
+    def __init__(self, url: str, report: Report, turn_timeout: float):
+        self.url = url
+        self.report = report
+        self.turn_timeout = turn_timeout
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.task_done = asyncio.Event()
+        self.first_output = asyncio.Event()
+        self.last_output = ""
+        self.waiting = False
+
+        self.client.on("task_end", self._on_task_end)
+        self.client.on("stream_token", self._on_output)
+        # Apps that don't stream only update the "Thinking..." message once the answer is ready.
+        self.client.on("update_message", self._on_output)
+
+    async def _on_task_end(self, *_):
+        if self.waiting:
+            self.task_done.set()
+
+    async def _on_output(self, data=None):
+        if not self.waiting:
+            return
+        if isinstance(data, dict) and data.get("type") == "assistant_message":
+            self.last_output = data.get("output", "")
+        self.first_output.set()
+
+    async def connect(self):
+        started = time.perf_counter()
+        await self.client.connect(
+            self.url,
+            socketio_path="/ws/socket.io",
+            transports=["websocket"],
+            auth={"sessionId": str(uuid.uuid4()), "clientType": "webapp", "userEnv": "{}"},
+        )
+        await self.client.emit("connection_successful")
+        self.report.connect_latencies.append(time.perf_counter() - started)
+
+    async def send(self, text: str):
+        self.task_done.clear()
+        self.first_output.clear()
+        self.last_output = ""
+        self.waiting = True
+        message = {
+            "id": str(uuid.uuid4()),
+            "threadId": "",
+            "name": "User",
+            "type": "user_message",
+            "output": text,
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+        }
+        started = time.perf_counter()
+        await self.client.emit("client_message", {"message": message, "fileReferences": []})
+        try:
+            await asyncio.wait_for(self.first_output.wait(), self.turn_timeout)
+            self.report.first_token_latencies.append(time.perf_counter() - started)
+            await asyncio.wait_for(self.task_done.wait(), self.turn_timeout)
+        except asyncio.TimeoutError:
+            self.report.error("timeout")
+            return
+        finally:
+            self.waiting = False
+        self.report.turn_latencies.append(time.perf_counter() - started)
+        self.report.turns += 1
+        if self.last_output.startswith("Error:"):
+            self.report.error("model_error")
+
+    async def close(self):
+        if self.client.connected:
+            await self.client.disconnect()
+        else:
+            # A connect that failed or timed out may still hold its HTTP session.
+            await self.client.eio.disconnect(abort=True)
+
+
+async def run_session(url: str, script: list[str], report: Report, think_time: float,
+                      turn_timeout: float, connect_timeout: float, connected: asyncio.Barrier | None):
+    session = ChatSession(url, report, turn_timeout)
+    try:
+        await asyncio.wait_for(session.connect(), connect_timeout)
+    except Exception as e:
+        report.error("connect timeout" if isinstance(e, asyncio.TimeoutError) else "connect")
+        if connected:
+            # Not every session will be open at once; release everyone waiting for that.
+            await connected.abort()
+        await session.close()
+        return
+    try:
+        if connected:
+            # Wait for every session to be open so memory per session can be measured.
+            try:
+                await connected.wait()
+            except asyncio.BrokenBarrierError:
+                pass
+        for text in script:
+            await session.send(text)
+            await asyncio.sleep(think_time)
+    except Exception:
+        report.error("session")
+    finally:
+        await session.close()
+
+
+async def probe_lag(url: str, report: Report, stop: asyncio.Event, interval: float):
+    """Poll a trivial endpoint; its latency is dominated by how busy the server loop is."""
+    async with httpx.AsyncClient(timeout=30) as client:
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                await client.get(f"{url}/auth/config")
+                report.probe_latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                report.error("probe")
+            await asyncio.sleep(interval)
+
+
+async def watch_client_lag(report: Report, stop: asyncio.Event, interval: float = 0.05):
+    """Track this harness's own loop lag so a saturated client isn't blamed on the server."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        report.client_lag.append(max(0.0, loop.time() - expected))
+
+
+async def wait_until_up(url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"{url}/auth/config")
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not come up within {timeout}s")
+
+
+def spawn_servers(args) -> tuple[list[subprocess.Popen], int]:
+    """Start the fake model and the chatbot (pointed at it) as child processes."""
+    model = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "fake_model.py"), "--port", str(args.model_port),
+         "--ttft", str(args.ttft), "--token-delay", str(args.token_delay), "--tokens", str(args.tokens),
+         "--error-rate", str(args.error_rate)],
+        stdout=subprocess.DEVNULL,
+    )
+    env = {**os.environ, "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "loadtest"),
+           "GEMINI_BASE_URL": f"http://127.0.0.1:{args.model_port}/"}
+    chat = subprocess.Popen(
+        [sys.executable, "-m", "chainlit", "run", args.app, "--headless", "--port", str(args.port)],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return [chat, model], chat.pid
+
+
+def load_script(path: str | None) -> list[list[str]]:
+    if not path:
+        return DEFAULT_SCRIPT
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def main_async(args) -> int:
+    url = args.url or f"http://127.0.0.1:{args.port}"
+    children, server_pid = [], args.server_pid
+    if args.spawn:
+        children, server_pid = spawn_servers(args)
+    try:
+        await wait_until_up(url)
+        scripts = load_script(args.script)
+        report = Report()
+        stop = asyncio.Event()
+        rss_before = rss_kib(server_pid) if server_pid else None
+
+        connected = asyncio.Barrier(args.sessions + 1)
+        watchers = [asyncio.create_task(probe_lag(url, report, stop, args.probe_interval)),
+                    asyncio.create_task(watch_client_lag(report, stop))]
+        started = time.perf_counter()
+        sessions = []
+        for i in range(args.sessions):
+            sessions.append(asyncio.create_task(run_session(
+                url, scripts[i % len(scripts)], report, args.think_time, args.turn_timeout, args.connect_timeout,
+                connected)))
+            if args.ramp:
+                await asyncio.sleep(args.ramp / args.sessions)
+        try:
+            await connected.wait()
+            rss_open = rss_kib(server_pid) if server_pid else None
+        except asyncio.BrokenBarrierError:
+            # A session failed to open, so there is no moment with all of them open to measure.
+            rss_open = None
+        await asyncio.gather(*sessions)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*watchers)
+
+        print_report(report, args, elapsed, rss_before, rss_open)
+        lag_p99 = percentile(report.probe_latencies, 99)
+        if args.max_lag and lag_p99 > args.max_lag:
+            print(f"\nFAIL: p99 event-loop lag {lag_p99 * 1000:.0f} ms exceeds {args.max_lag * 1000:.0f} ms. "
+                  f"Something is blocking the server's event loop.")
+            return 1
+        return 0
+    finally:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.wait()
+
+
+def print_report(report: Report, args, elapsed: float, rss_before: int | None, rss_open: int | None):
+    def line(label: str, values: list[float]):
+        if not values:
+            print(f"  {label:<22} n/a")
+            return
+        print(f"  {label:<22} p50 {percentile(values, 50) * 1000:8.1f} ms   p90 {percentile(values, 90) * 1000:8.1f} ms"
+              f"   p99 {percentile(values, 99) * 1000:8.1f} ms   max {max(values) * 1000:8.1f} ms")
+
+    attempted = report.turns + report.errors.get("timeout", 0)
+    print(f"\n{args.sessions} sessions, {report.turns} turns in {elapsed:.1f}s "
+          f"({report.turns / elapsed:.1f} turns/s)\n")
+    line("connect", report.connect_latencies)
+    line("first token", report.first_token_latencies)
+    line("turn", report.turn_latencies)
+    line("server loop lag probe", report.probe_latencies)
+    line("client loop lag", report.client_lag)
+    if report.probe_latencies:
+        print(f"  {'':<22} mean probe {statistics.mean(report.probe_latencies) * 1000:.1f} ms")
+
+    print("\nErrors:")
+    if not report.errors:
+        print("  none")
+    for kind, count in sorted(report.errors.items()):
+        rate = f" ({count / attempted:.1%} of turns)" if kind in ("timeout", "model_error") and attempted else ""
+        print(f"  {kind:<22} {count}{rate}")
+
+    if rss_before is not None and rss_open is not None:
+        per_session = (rss_open - rss_before) / max(args.sessions, 1)
+        print(f"\nServer memory: {rss_before / 1024:.1f} MiB idle, {rss_open / 1024:.1f} MiB with all sessions open "
+              f"({per_session:.1f} KiB per session)")
+    elif rss_before is not None:
+        print("\nServer memory: not measured, since not every session connected.")
+    if report.client_lag and percentile(report.client_lag, 99) > 0.05:
+        print("\nNote: the load generator itself is lagging; results may understate server capacity.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Websocket load test for the Chainlit chatbot.")
+    parser.add_argument("--url", help="chatbot URL (default http://127.0.0.1:PORT)")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--script", help="JSON file with a list of conversations (lists of user messages)")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which sessions are opened")
+    parser.add_argument("--think-time", type=float, default=1.0, help="seconds between turns")
+    parser.add_argument("--turn-timeout", type=float, default=120.0)
+    parser.add_argument("--connect-timeout", type=float, default=15.0, help="seconds to open one session")
+    parser.add_argument("--probe-interval", type=float, default=0.2)
+    parser.add_argument("--max-lag", type=float, default=0.0,
+                        help="exit non-zero if the p99 loop-lag probe exceeds this many seconds")
+    parser.add_argument("--server-pid", type=int, help="chatbot process id, for memory per session")
+    parser.add_argument("--spawn", action="store_true", help="start the fake model and the chatbot locally")
+    parser.add_argument("--app", default="main.py", help="chatbot entry point to spawn")
+    parser.add_argument("--model-port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
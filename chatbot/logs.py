@@ -0,0 +1,146 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+
+# Payloads (history, messages) are kept for roughly one turn in a hundred by default.
+SAMPLE_RATE = float(os.getenv("CHAT_LOG_SAMPLE_RATE", "0.01"))
+# Every string in a log line is capped at this many characters.
+MAX_FIELD_CHARS = int(os.getenv("CHAT_LOG_MAX_FIELD", "2000"))
+# Lists (e.g. a sampled history) keep only their last this-many items.
+MAX_LIST_ITEMS = int(os.getenv("CHAT_LOG_MAX_ITEMS", "50"))
+# Records waiting for the writer thread; beyond this new records are dropped, never awaited.
+QUEUE_SIZE = int(os.getenv("CHAT_LOG_QUEUE_SIZE", "10000"))
+
+REDACTIONS = [
+    (re.compile(r"AIza[0-9A-Za-z_\-]{20,}"), "[REDACTED_API_KEY]"),
+    (re.compile(r"\bsk-[0-9A-Za-z_\-]{16,}"), "[REDACTED_API_KEY]"),
+    (re.compile(r"(?i)bearer\s+[0-9A-Za-z._\-]+"), "Bearer [REDACTED]"),
+    (re.compile(r"[\w.+\-]+@[\w\-]+\.[\w.\-]+"), "[REDACTED_EMAIL]"),
+]
+
+
+def redact(text: str) -> str:
+    for pattern, replacement in REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _clean(value, limit: int):
+    """Redact and cap every string inside a log field."""
+    if isinstance(value, str):
+        # Redact before cutting: a secret split by the cut would no longer match its pattern.
+        value = redact(value)
+        if len(value) > limit:
+            value = f"{value[:limit]}...(+{len(value) - limit} chars)"
+        return value
+    if isinstance(value, dict):
+        return {k: _clean(v, limit) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [_clean(v, limit) for v in value[-MAX_LIST_ITEMS:]]
+        if len(value) > MAX_LIST_ITEMS:
+            items.insert(0, f"...({len(value) - MAX_LIST_ITEMS} earlier items)")
+        return items
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    return _clean(str(value), limit)
+
+
+def sampled(payload, rate: float | None = None):
+    """Return the payload for a sampled fraction of calls, otherwise only its size.
+
+    This runs on the caller's thread, so it stays O(1): the payload is passed by
+    reference and only serialized later by the writer thread.
+    """
+    rate = SAMPLE_RATE if rate is None else rate
+    if random.random() < rate:
+        return payload
+    return {"omitted": True, "size": len(payload)}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, event and the record's fields."""
+
+    def __init__(self, max_field_chars: int = MAX_FIELD_CHARS):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        line.update(_clean(getattr(record, "fields", {}), self.max_field_chars))
+        if record.exc_info:
+            line["exc"] = _clean(self.formatException(record.exc_info), self.max_field_chars)
+        return json.dumps(line, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without formatting or ever waiting.
+
+    The stock QueueHandler formats the record on the calling thread; here all
+    formatting, redaction and I/O happen on the listener thread instead.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full at exit, so wait for the writer to make room.
+        self.queue.put(self._sentinel)
+
+
+def setup_logging(name: str = "chatbot", level: str | None = None, stream=None) -> logging.Logger:
+    """Configure the named logger with a queue-backed JSON handler and return it."""
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        return logger
+
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(JsonFormatter())
+    listener = _Listener(log_queue, writer, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger.addHandler(NonBlockingQueueHandler(log_queue))
+    logger.setLevel(level or os.getenv("CHAT_LOG_LEVEL", "INFO"))
+    logger.propagate = False
+    return logger
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    """Log a structured event. Fields are serialized on the writer thread."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+class Timer:
+    """Measures elapsed milliseconds for log fields."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+
+    def ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 1)
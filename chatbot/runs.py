@@ -0,0 +1,99 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+from agents import Agent, Runner
+from agents.result import RunResultStreaming
+from agents.run import RunConfig
+from openai.types.responses import ResponseTextDeltaEvent
+
+# Roughly four characters per token is close enough for the savings estimate.
+CHARS_PER_TOKEN = 4
+
+POLICIES = ("cancel", "supersede")
+
+
+@dataclass
+class TrackedRun:
+    session_id: str
+    result: RunResultStreaming
+    started: float = field(default_factory=time.monotonic)
+    output_chars: int = 0
+    cancelled: bool = False
+    finished: bool = False
+
+
+@dataclass
+class RunMetrics:
+    started: int = 0
+    completed: int = 0
+    cancelled: int = 0
+    completed_output_tokens: int = 0
+    # Output tokens the cancelled runs had already produced before they were stopped.
+    cancelled_output_tokens: int = 0
+    # Estimated output tokens the cancelled runs would still have produced.
+    tokens_saved: int = 0
+
+    def average_output_tokens(self) -> float:
+        return self.completed_output_tokens / self.completed if self.completed else 0.0
+
+
+class RunTracker:
+    """Tracks the in-flight agent runs of every chat session so they can be cancelled.
+
+    Policies for a new message while an older run is still going:
+      - "cancel": the older run is stopped and its question is dropped.
+      - "supersede": the older run is stopped and its question is folded into the new run.
+    """
+
+    def __init__(self, policy: str = "cancel"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown run policy '{policy}'. Expected one of {POLICIES}.")
+        self.policy = policy
+        self.runs: dict[str, list[TrackedRun]] = {}
+        self.metrics = RunMetrics()
+
+    def start(self, session_id: str, agent: Agent, input: Any, run_config: RunConfig) -> TrackedRun:
+        result = Runner.run_streamed(starting_agent=agent, input=input, run_config=run_config)
+        run = TrackedRun(session_id=session_id, result=result)
+        self.runs.setdefault(session_id, []).append(run)
+        self.metrics.started += 1
+        return run
+
+    async def text_deltas(self, run: TrackedRun) -> AsyncIterator[str]:
+        """Yield the text deltas of a run, stopping as soon as it is cancelled."""
+        try:
+            async for event in run.result.stream_events():
+                if run.cancelled:
+                    break
+                if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                    run.output_chars += len(event.data.delta)
+                    yield event.data.delta
+        finally:
+            self._remove(run)
+        if not run.cancelled:
+            run.finished = True
+            self.metrics.completed += 1
+            self.metrics.completed_output_tokens += run.result.context_wrapper.usage.output_tokens
+
+    def cancel_session(self, session_id: str) -> int:
+        """Cancel every outstanding run of a session and return how many were stopped."""
+        stopped = 0
+        for run in self.runs.pop(session_id, []):
+            if run.finished or run.cancelled:
+                continue
+            run.cancelled = True
+            # Cancelling the run task also closes the underlying HTTP stream to the model.
+            run.result.cancel()
+            produced = run.output_chars // CHARS_PER_TOKEN
+            self.metrics.cancelled += 1
+            self.metrics.cancelled_output_tokens += produced
+            self.metrics.tokens_saved += max(0, round(self.metrics.average_output_tokens()) - produced)
+            stopped += 1
+        return stopped
+
+    def _remove(self, run: TrackedRun):
+        runs = self.runs.get(run.session_id, [])
+        if run in runs:
+            runs.remove(run)
+        if not runs:
+            self.runs.pop(run.session_id, None)
@@ -0,0 +1,74 @@
+import asyncio
+from agents import Model
+from fallback import CircuitBreaker, FallbackModel, Tier
+
+
+class StubModel(Model):
+    """Answers after `delay` seconds; streams `events` events, `delay` seconds apart."""
+
+    def __init__(self, delay: float = 0.0, events: int = 3):
+        self.delay = delay
+        self.events = events
+        self.calls = 0
+
+    async def get_response(self, *args, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return "ok"
+
+    async def stream_response(self, *args, **kwargs):
+        self.calls += 1
+        for i in range(self.events):
+            await asyncio.sleep(self.delay)
+            yield i
+
+
+def half_open_tier(model: Model) -> Tier:
+    """A tier whose breaker is open with its cooldown over, so the next call is the probe."""
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.0)
+    breaker.record_failure()
+    return Tier("stub", model, breaker)
+
+
+def test_cancelled_probe_releases_the_breaker():
+    tier = half_open_tier(StubModel(delay=10))
+    fallback = FallbackModel([tier])
+
+    async def run():
+        task = asyncio.create_task(fallback.get_response())
+        await asyncio.sleep(0.01)
+        assert tier.breaker.state == "half-open"
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert not tier.breaker.probing
+    assert tier.breaker.allow()
+
+
+def test_stream_closed_early_releases_the_breaker():
+    tier = half_open_tier(StubModel())
+    fallback = FallbackModel([tier])
+
+    async def run():
+        stream = fallback.stream_response()
+        assert await anext(stream) == 0
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert not tier.breaker.probing
+    assert tier.breaker.allow()
+
+
+def test_successful_probe_closes_the_breaker():
+    tier = half_open_tier(StubModel())
+    assert asyncio.run(FallbackModel([tier]).get_response()) == "ok"
+    assert tier.breaker.state == "closed"
+
+
+def test_skipped_tier_keeps_its_probe_unclaimed():
+    primary, secondary = Tier("primary", StubModel()), half_open_tier(StubModel())
+    asyncio.run(FallbackModel([primary, secondary]).get_response())
+    assert secondary.model.calls == 0
+    assert secondary.breaker.state == "open"
+    assert secondary.breaker.allow()
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+import httpx
+from tools import HERE, FixtureBackend, SearchBackend, SearchResult, WebSearcher
+
+FIXTURE = os.path.join(HERE, "fixtures", "search.json")
+
+
+class CountingBackend(SearchBackend):
+    """Returns one result without HTML after `delay` seconds, counting the searches."""
+
+    def __init__(self, delay: float = 0.0, url: str = "https://example.test/page"):
+        self.delay = delay
+        self.url = url
+        self.calls = 0
+
+    async def search(self, query, k):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return [SearchResult(title="Result", url=self.url, snippet="the snippet")]
+
+
+def serve(body: bytes, content_type: str = "text/html") -> httpx.AsyncClient:
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body,
+                                                                   headers={"content-type": content_type}))
+    return httpx.AsyncClient(transport=transport)
+
+
+def test_fixture_backend_matches_normalized_queries():
+    backend = FixtureBackend(FIXTURE)
+    results = asyncio.run(backend.search("Python   AsyncIO?", 5))
+    assert [r.title for r in results] == ["asyncio — Asynchronous I/O", "Coroutines and Tasks"]
+
+
+def test_fixture_backend_falls_back_to_shared_words():
+    results = asyncio.run(FixtureBackend(FIXTURE).search("coroutines explained", 5))
+    assert [r.title for r in results] == ["Coroutines and Tasks"]
+
+
+def test_fixture_pages_are_extracted_without_fetching():
+    searcher = WebSearcher(FixtureBackend(FIXTURE))
+    pages = asyncio.run(searcher.search("python asyncio"))
+    assert pages[0]["text"].startswith("asyncio — Asynchronous I/O asyncio is a library")
+    assert "var x" not in pages[0]["text"]
+    assert searcher.client is None
+
+
+def test_results_are_cached_until_the_ttl_expires():
+    backend = CountingBackend()
+    searcher = WebSearcher(backend, cache_ttl=0.2)
+    searcher.client = serve(b"<p>page</p>")
+
+    async def run():
+        first = await searcher.search("Some query")
+        assert await searcher.search("some query!") is first
+        await asyncio.sleep(0.25)
+        await searcher.search("some query")
+    asyncio.run(run())
+    assert backend.calls == 2
+
+
+def test_concurrent_identical_queries_share_one_search():
+    backend = CountingBackend(delay=0.05)
+    searcher = WebSearcher(backend)
+    searcher.client = serve(b"<p>page</p>")
+
+    async def run():
+        return await asyncio.gather(*(searcher.search("same query") for _ in range(5)))
+    pages = asyncio.run(run())
+    assert backend.calls == 1
+    assert all(p is pages[0] for p in pages)
+    assert searcher.in_flight == {}
+
+
+def test_cancelling_the_first_caller_does_not_fail_the_others():
+    searcher = WebSearcher(CountingBackend(delay=0.1))
+    searcher.client = serve(b"<p>page text</p>")
+
+    async def run():
+        leader = asyncio.create_task(searcher.search("shared"))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(searcher.search("shared"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+    pages = asyncio.run(run())
+    assert pages[0]["text"] == "page text"
+
+
+def test_slow_pages_fall_back_to_the_snippet_within_the_budget():
+    searcher = WebSearcher(CountingBackend(), budget=0.3)
+
+    async def slow_fetch(url):
+        await asyncio.sleep(30)
+    searcher._fetch = slow_fetch
+    started = time.monotonic()
+    pages = asyncio.run(searcher.search("slow"))
+    assert time.monotonic() - started < 1.0
+    assert pages[0]["text"] == "the snippet"
+
+
+def test_page_bodies_are_read_up_to_the_byte_limit():
+    searcher = WebSearcher(CountingBackend(), max_page_bytes=1000)
+    searcher.client = serve(b"<p>" + b"a" * 100_000 + b"</p>")
+    html = asyncio.run(searcher._fetch("https://example.test/big"))
+    assert len(html) == 1000
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from html.parser import HTMLParser
+import httpx
+from agents import function_tool
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class SearchResult:
+    title: str
+    url: str
+    snippet: str = ""
+    # Fixture backends can ship the page body so nothing is fetched over the network.
+    html: str | None = None
+
+
+class SearchBackend:
+    """Base class for search backends. Subclasses return the top `k` results for a query."""
+
+    async def search(self, query: str, k: int) -> list[SearchResult]:
+        raise NotImplementedError
+
+
+class DuckDuckGoBackend(SearchBackend):
+    """Searches DuckDuckGo through the `duckduckgo_search` package."""
+
+    async def search(self, query: str, k: int) -> list[SearchResult]:
+        from duckduckgo_search import DDGS
+
+        def _search():
+            with DDGS() as ddgs:
+                return list(ddgs.text(query, max_results=k))
+
+        # DDGS is synchronous, so keep it off the event loop.
+        hits = await asyncio.to_thread(_search)
+        return [SearchResult(title=h.get("title", ""), url=h.get("href", ""), snippet=h.get("body", ""))
+                for h in hits]
+
+
+class FixtureBackend(SearchBackend):
+    """Serves canned results from a local JSON file, for tests and offline runs.
+
+    The file maps a query to a list of results: {"query": [{"title", "url", "snippet", "html"}]}.
+    Unknown queries fall back to every result whose title or snippet shares a word with the query.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        self.results = {normalize_query(q): [SearchResult(**r) for r in rs] for q, rs in raw.items()}
+
+    async def search(self, query: str, k: int) -> list[SearchResult]:
+        key = normalize_query(query)
+        if key in self.results:
+            return self.results[key][:k]
+        words = set(key.split())
+        matches = [r for rs in self.results.values() for r in rs
+                   if words & set(normalize_query(f"{r.title} {r.snippet}").split())]
+        return matches[:k]
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so equivalent queries share a cache entry."""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+class _TextExtractor(HTMLParser):
+    SKIP = {"script", "style", "noscript", "svg", "head", "nav", "footer", "form"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skipping += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self.skipping:
+            self.skipping -= 1
+
+    def handle_data(self, data):
+        if not self.skipping and data.strip():
+            self.parts.append(data.strip())
+
+
+def extract_text(html: str, max_chars: int) -> str:
+    """Return the readable text of an HTML page, capped at `max_chars`."""
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    return " ".join(" ".join(parser.parts).split())[:max_chars]
+
+
+class TTLCache:
+    """A small LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class WebSearcher:
+    """Runs a search, fetches the top pages concurrently and caches the extracted text.
+
+    Pages are fetched in parallel through one pooled HTTP client, so a search costs
+    roughly the slowest single fetch instead of the sum of all of them. The whole search,
+    extraction included, is bounded by `budget` seconds: pages not ready by then fall back to
+    their snippet. Page bodies are read up to `max_page_bytes`.
+    """
+
+    def __init__(self, backend: SearchBackend, top_k: int = 3, max_connections: int = 10,
+                 fetch_timeout: float = 8.0, cache_ttl: float = 600, max_chars: int = 2000,
+                 workers: int = 4, budget: float = 12.0, max_page_bytes: int = 1_000_000):
+        self.backend = backend
+        self.top_k = top_k
+        self.max_connections = max_connections
+        self.fetch_timeout = fetch_timeout
+        self.max_chars = max_chars
+        self.budget = budget
+        self.max_page_bytes = max_page_bytes
+        self.cache = TTLCache(cache_ttl)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract")
+        self.client: httpx.AsyncClient | None = None
+        self.in_flight: dict[str, asyncio.Task] = {}
+
+    def _client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=self.fetch_timeout,
+                follow_redirects=True,
+                headers={"User-Agent": "Mozilla/5.0 (compatible; chatbot-web-search)"},
+            )
+        return self.client
+
+    async def search(self, query: str) -> list[dict]:
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        # Identical queries arriving together share a single search. It runs as its own task and
+        # every caller waits through a shield, so a caller whose run is cancelled (the user
+        # pressed stop) doesn't cancel the search for the others.
+        task = self.in_flight.get(key)
+        if task is None:
+            task = self.in_flight[key] = asyncio.create_task(self._search(query, key))
+            task.add_done_callback(lambda t: self._finished(key, t))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved, in case every caller was cancelled.
+
+    async def _search(self, query: str, key: str) -> list[dict]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.budget
+        results = await asyncio.wait_for(self.backend.search(query, self.top_k), self.budget)
+        tasks = [asyncio.create_task(self._page_text(r)) for r in results]
+        if tasks:
+            await asyncio.wait(tasks, timeout=max(0.0, deadline - loop.time()))
+        pages = []
+        for r, task in zip(results, tasks):
+            text = task.result() if task.done() else ""
+            task.cancel()
+            pages.append({"title": r.title, "url": r.url, "text": text or r.snippet})
+        self.cache.set(key, pages)
+        return pages
+
+    async def _page_text(self, result: SearchResult) -> str:
+        html = result.html if result.html is not None else await self._fetch(result.url)
+        if not html:
+            return ""
+        loop = asyncio.get_running_loop()
+        # Parsing is CPU bound, so it runs in the worker pool rather than on the event loop.
+        return await loop.run_in_executor(self.pool, extract_text, html, self.max_chars)
+
+    async def _fetch(self, url: str) -> str:
+        try:
+            async with self._client().stream("GET", url) as response:
+                response.raise_for_status()
+                if "html" not in response.headers.get("content-type", "html"):
+                    return ""
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) >= self.max_page_bytes:
+                        break
+                return body[:self.max_page_bytes].decode(response.encoding or "utf-8", errors="replace")
+        except (httpx.HTTPError, ValueError):
+            # A slow or broken page shouldn't sink the whole search; its snippet is used instead.
+            return ""
+
+
+def backend_from_env() -> SearchBackend:
+    """Pick the backend from SEARCH_BACKEND ("duckduckgo" or "fixture")."""
+    if os.getenv("SEARCH_BACKEND", "duckduckgo").lower() == "fixture":
+        return FixtureBackend(os.getenv("SEARCH_FIXTURE", os.path.join(HERE, "fixtures", "search.json")))
+    return DuckDuckGoBackend()
+
+
+searcher = WebSearcher(backend_from_env())
+
+
+@function_tool
+async def web_search(query: str) -> str:
+    """Search the web and return the readable text of the top results.
+
+    Args:
+        query: What to search for.
+    """
+    try:
+        pages = await searcher.search(query)
+    except Exception as e:
+        return f"Error: web search failed: {e}"
+    if not pages:
+        return f"No results found for '{query}'."
+    return "\n\n".join(f"[{i}] {p['title']}\n{p['url']}\n{p['text']}" for i, p in enumerate(pages, 1))